@@ -0,0 +1,62 @@
+"""Run the firmware modules on CPython against simulated peripherals and a virtual clock.
+
+`install()` has to come before the first firmware import, it puts the stand-ins for the board modules in place.
+
+    from embeded import host
+
+    host.install()
+    from embeded.motor import StepperMotor  # or `import motor`, as main.py does on the board
+
+    StepperMotor(2, 4).step(4000, 1500)
+    print(host.clock.time())  # 6.04 virtual seconds, returned instantly
+"""
+
+import sys
+import time as _time
+from importlib.machinery import PathFinder, SourceFileLoader
+from pathlib import Path
+
+from . import clock, machine
+
+FIRMWARE = Path(__file__).resolve().parent.parent
+
+
+class FirmwareLoader(SourceFileLoader):
+    def exec_module(self, module):
+        super().exec_module(module)
+        # the board's `time` has sleep_us and friends, point the module at the virtual clock instead
+        if getattr(module, 'time', None) is _time:
+            module.time = clock
+
+
+class FirmwareFinder:
+    @classmethod
+    def find_spec(cls, name, path=None, target=None):
+        spec = PathFinder.find_spec(name, path)
+        if spec is None or spec.origin is None:
+            return None
+
+        origin = Path(spec.origin)
+        if origin.parent != FIRMWARE or origin.suffix != '.py':
+            return None
+
+        spec.loader = FirmwareLoader(name, spec.origin)
+        return spec
+
+
+def install():
+    """Provide `machine` and load every firmware module, flat or as `embeded.*`, on the virtual clock."""
+    sys.modules['machine'] = machine
+    if FirmwareFinder not in sys.meta_path:
+        sys.meta_path.insert(0, FirmwareFinder)
+    # main.py imports its siblings flat, as they sit at the root of the board's filesystem
+    if str(FIRMWARE) not in sys.path:
+        sys.path.append(str(FIRMWARE))
+
+
+def uninstall():
+    sys.modules.pop('machine', None)
+    if FirmwareFinder in sys.meta_path:
+        sys.meta_path.remove(FirmwareFinder)
+    if str(FIRMWARE) in sys.path:
+        sys.path.remove(str(FIRMWARE))
@@ -0,0 +1,61 @@
+"""Virtual clock standing in for the firmware's `time`, sleeping only moves it forward."""
+
+now_ns = 0
+sleeps = 0
+
+
+def reset(ns=0):
+    global now_ns, sleeps
+    now_ns = ns
+    sleeps = 0
+
+
+def advance_ns(ns):
+    global now_ns, sleeps
+    if ns > 0:
+        now_ns += int(ns)
+    sleeps += 1
+
+
+def sleep(seconds):
+    advance_ns(seconds * 1_000_000_000)
+
+
+def sleep_ms(ms):
+    advance_ns(ms * 1_000_000)
+
+
+def sleep_us(us):
+    advance_ns(us * 1_000)
+
+
+def time():
+    return now_ns / 1e9
+
+
+def time_ns():
+    return now_ns
+
+
+def monotonic():
+    return now_ns / 1e9
+
+
+def ticks_ms():
+    return now_ns // 1_000_000
+
+
+def ticks_us():
+    return now_ns // 1_000
+
+
+def ticks_ns():
+    return now_ns
+
+
+def ticks_diff(ticks1, ticks2):
+    return ticks1 - ticks2
+
+
+def ticks_add(ticks, delta):
+    return ticks + delta
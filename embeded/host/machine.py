@@ -0,0 +1,192 @@
+from . import clock
+
+# last peripheral created for each id, so a test bench can wire inputs after the firmware built them
+pins = {}
+uarts = {}
+
+
+class Pin:
+    """Simulated GPIO, inputs read `level` which may be a constant or a callable of the virtual time in us."""
+
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 2
+    IRQ_RISING = 1
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self.level = 1 if pull == Pin.PULL_UP else 0
+        # pulse width seen by `time_pulse_us`, `None` never starts a pulse
+        self.pulse_us = None
+        self.toggles = 0
+        pins[id] = self
+
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if pull != -1:
+            self.pull = pull
+        if value is not None:
+            self.value(value)
+
+    def value(self, x=None):
+        if x is None:
+            level = self.level
+            return level(clock.ticks_us()) if callable(level) else level
+
+        x = 1 if x else 0
+        if x != self.level:
+            self.toggles += 1
+        self.level = x
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        pass
+
+
+class PWM:
+    """Simulated PWM output, only keeps the configured frequency and duty."""
+
+    def __init__(self, dest, freq=None, duty=None, duty_u16=None, duty_ns=None):
+        self.pin = dest if isinstance(dest, Pin) else Pin(dest, Pin.OUT)
+        self._freq = freq or 5000
+        self._duty_u16 = 0
+        self.init(freq, duty, duty_u16, duty_ns)
+
+    def init(self, freq=None, duty=None, duty_u16=None, duty_ns=None):
+        if freq is not None:
+            self._freq = freq
+        if duty is not None:
+            self.duty(duty)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+        if duty_ns is not None:
+            self.duty_ns(duty_ns)
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty(self, value=None):
+        if value is None:
+            return self._duty_u16 >> 6
+        self._duty_u16 = min(max(int(value), 0), 1023) << 6
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty_u16
+        self._duty_u16 = min(max(int(value), 0), 65535)
+
+    def duty_ns(self, value=None):
+        period_ns = 1e9 / self._freq
+        if value is None:
+            return int(self._duty_u16 * period_ns / 65535)
+        self._duty_u16 = min(max(int(value * 65535 / period_ns), 0), 65535)
+
+    def deinit(self):
+        self._duty_u16 = 0
+
+
+class ADC:
+    """Simulated ADC, `uv` is the input in microvolts, a constant or a callable of the virtual time in us."""
+
+    ATTN_0DB = 0
+    ATTN_2_5DB = 1
+    ATTN_6DB = 2
+    ATTN_11DB = 3
+    WIDTH_12BIT = 12
+
+    FULL_SCALE_UV = 3_300_000
+
+    def __init__(self, pin, atten=None):
+        self.pin = pin
+        self.atten = atten
+        self.uv = self.FULL_SCALE_UV // 2
+
+    def init(self, atten=None):
+        self.atten = atten
+
+    def read_uv(self):
+        uv = self.uv
+        return int(uv(clock.ticks_us()) if callable(uv) else uv)
+
+    def read_u16(self):
+        return min(max(self.read_uv() * 65535 // self.FULL_SCALE_UV, 0), 65535)
+
+    def read(self):
+        return self.read_u16() >> 4
+
+
+class UART:
+    """Simulated UART, `feed` queues bytes for the firmware and `tx` collects what it wrote.
+
+    Writes advance the virtual clock by the time the bytes take on the wire.
+    """
+
+    def __init__(self, id, baudrate=115200, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+        self.rx = bytearray()
+        self.tx = bytearray()
+        uarts[id] = self
+
+    def init(self, baudrate=None, bits=8, parity=None, stop=1, **kwargs):
+        if baudrate is not None:
+            self.baudrate = baudrate
+
+    def feed(self, data: bytes):
+        self.rx += data
+
+    def any(self):
+        return len(self.rx)
+
+    def read(self, nbytes=None):
+        if not self.rx:
+            return None
+
+        nbytes = len(self.rx) if nbytes is None else nbytes
+        data = bytes(self.rx[:nbytes])
+        del self.rx[:nbytes]
+        return data
+
+    def readline(self):
+        if not self.rx:
+            return None
+
+        end = self.rx.find(b'\n')
+        return self.read(len(self.rx) if end < 0 else end + 1)
+
+    def write(self, buf):
+        self.tx += buf
+        clock.sleep_us(len(buf) * 10 * 1_000_000 // self.baudrate)
+        return len(buf)
+
+
+def time_pulse_us(pin, pulse_level, timeout_us=1000000):
+    """Return the simulated `pin.pulse_us`, -2 when no pulse starts before the timeout."""
+    width = pin.pulse_us
+    if width is None:
+        clock.sleep_us(timeout_us)
+        return -2
+    if width > timeout_us:
+        clock.sleep_us(timeout_us)
+        return -1
+
+    clock.sleep_us(width)
+    return int(width)
@@ -8,7 +8,7 @@ class UltrasonicSensor:
 
     def __init__(self, triger_pin_id, echo_pin_id, sonic=291, signal_us=(2, 10), timeout=500 * 2 * 30):
         """Initialize the ultrasonic sensor with given pin IDs and parameters."""
-        assert len(self.signal_us) == 2, 'signal_us must have exactly 2 elements: [zore_level_time, high_level_time]'
+        assert len(signal_us) == 2, 'signal_us must have exactly 2 elements: [zore_level_time, high_level_time]'
 
         self.trigger_pin = Pin(triger_pin_id, mode=Pin.OUT, pull=None)
         self.trigger_pin.value(0)
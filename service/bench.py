@@ -0,0 +1,121 @@
+"""Micro-benchmarks for the host side hot paths, run `python bench.py [capture]` on the MaixCAM or any host.
+
+Replies are parsed from the given `WireCapture` log of a dashboard session, or from built-in samples.
+"""
+
+import sys
+from array import array
+from inspect import signature
+from timeit import Timer
+
+from dobot import Dobot, FrameBuffer, WireCapture, parse_reply, parse_reply_into
+from kinematics import Arm
+
+SAMPLE_REPLIES = [
+    '0,{},ClearError()',
+    '0,{5},RobotMode()',
+    '0,{40},SpeedFactor(40)',
+    '0,{-170.0000,-30.0000,-90.0000,-60.0000,-80.0000,0.0000},GetAngle()',
+    '0,{312.5012,-120.4410,225.1031,179.9921,-0.0213,-90.0007},GetPose(user=0,tool=0)',
+    '0,{12},MovJ(joint={-170,-30,-90,-60,-80,0},v=50)',
+]
+
+
+def legacy_encode(func, *args, **kwargs) -> str:
+    # what `Dobot.send` did on every call before the encoders were compiled
+    bound = signature(func).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    params = [
+        f'{k.removeprefix("_")}={v}' if k.startswith('_') else str(v)
+        for k, v in bound.arguments.items()
+        if k != 'self' and v is not None
+    ]
+    return f'{func.__name__}({",".join(params)})'
+
+
+def legacy_parse(res: str, cmd: str):
+    # what `Dobot.parse` did before the single pass parser
+    func_name, _ = cmd.split('(', 1)
+    err, params_ = res.split(',{', 1)
+    params, _ = params_.split('},' + func_name, 1)
+    params = [float(p) if '.' in p else int(p) for p in params.split(',')] if params else []
+    return int(err), params, func_name + _
+
+
+def load_replies(path) -> list:
+    frames = FrameBuffer()
+    for _, direction, chunk in WireCapture.load(path):
+        if direction == WireCapture.RECV:
+            frames.feed(chunk)
+
+    replies = []
+    while (frame := frames.pop()) is not None:
+        if frame.endswith(';'):
+            replies.append(frame.removesuffix(';'))
+    return replies
+
+
+def measure(stmt, number: int) -> float:
+    # best of five, in microseconds per call
+    return min(Timer(stmt).repeat(5, number)) / number * 1e6
+
+
+def bench_encode(number=20000) -> None:
+    cases = [
+        ('ClearError', (), {}),
+        ('GetPose', (), {}),
+        ('EnableRobot', (0.2, 0, 0, 0, 1), {}),
+        ('MovJ', ('joint={-170,-30,-90,-60,-80,0}',), {'_v': 50, '_cp': 100}),
+        ('RelMovLTool', (0, -70.5, 0, 0, 0, 0), {'_v': 100}),
+    ]
+
+    print(f'{"command":<14}{"legacy us":>12}{"compiled us":>14}{"speedup":>10}')
+    for name, args, kwargs in cases:
+        func = getattr(Dobot, name)
+        # loop values bound as defaults, a closure would see whatever the loop holds when it runs
+        before = measure(lambda f=func, a=args, k=kwargs: legacy_encode(f.__wrapped__, *a, **k), number)
+        after = measure(lambda f=func, a=args, k=kwargs: f.encode(*a, **k), number)
+        print(f'{name:<14}{before:>12.2f}{after:>14.2f}{before / after:>9.1f}x')
+
+
+def bench_parse(replies: list, number=2000) -> None:
+    # the legacy parser needs the command that was sent, recover it from the echo
+    cmds = [parse_reply(res)[2] for res in replies]
+    out = array('d', bytes(8 * 64))
+
+    def legacy():
+        for res, cmd in zip(replies, cmds):
+            legacy_parse(res, cmd)
+
+    def single_pass():
+        for res in replies:
+            parse_reply(res)
+
+    def into():
+        for res in replies:
+            parse_reply_into(res, out)
+
+    before = measure(legacy, number) / len(replies)
+    print(f'{"parser":<14}{"us/reply":>12}{"speedup":>10}   over {len(replies)} replies')
+    print(f'{"legacy":<14}{before:>12.2f}')
+    for name, func in (('parse_reply', single_pass), ('parse_into', into)):
+        after = measure(func, number) / len(replies)
+        print(f'{name:<14}{after:>12.2f}{before / after:>9.1f}x')
+
+
+def bench_kinematics(number=200) -> None:
+    arm = Arm()
+    joints = [-170, -30, -90, -60, -80, 0]
+    pose = arm.offset(arm.fk(joints), [0, -70, 0, 0, 0, 0])
+
+    print(f'{"kinematics":<14}{"us/call":>12}')
+    print(f'{"fk":<14}{measure(lambda: arm.fk(joints), number * 10):>12.2f}')
+    print(f'{"ik":<14}{measure(lambda: arm.ik(pose, joints), number):>12.2f}')
+
+
+if __name__ == '__main__':
+    bench_encode()
+    print()
+    bench_parse(load_replies(sys.argv[1]) if len(sys.argv) > 1 else SAMPLE_REPLIES)
+    print()
+    bench_kinematics()
@@ -1,8 +1,11 @@
-import queue
+import asyncio
+import os
+import selectors
 import socket
+import struct
+import termios
 import threading
-
-from maix import uart
+from time import monotonic, sleep
 
 
 class ConnStatus:
@@ -10,9 +13,181 @@ class ConnStatus:
     DISCONNECTED = False
 
 
-class SocketConn:
+# dobot replies end with `;` and esp32 lines end with `\n`
+FRAME_TERMINATORS = (b';', b'\n')
+
+
+class FrameBuffer:
+    def __init__(self, size=1024):
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+        self.start = 0
+        self.end = 0
+
+    def reserve(self, size: int) -> None:
+        if len(self.data) - self.end >= size:
+            return
+
+        # move the unread tail to the front, grow only if it still does not fit
+        pending = self.end - self.start
+        if pending + size > len(self.data):
+            data = bytearray(max(len(self.data) * 2, pending + size))
+            data[:pending] = self.view[self.start : self.end]
+            self.data = data
+            self.view = memoryview(data)
+        else:
+            self.view[:pending] = self.view[self.start : self.end]
+
+        self.start = 0
+        self.end = pending
+
+    def clear(self) -> None:
+        self.start = self.end = 0
+
+    def feed(self, chunk: bytes) -> None:
+        size = len(chunk)
+        self.reserve(size)
+        self.data[self.end : self.end + size] = chunk
+        self.end += size
+
+    def free(self, size=1) -> memoryview:
+        self.reserve(size)
+        return self.view[self.end :]
+
+    def commit(self, size: int) -> None:
+        self.end += size
+
+    def pop(self) -> str | None:
+        while self.start < self.end:
+            stop = -1
+            for terminator in FRAME_TERMINATORS:
+                idx = self.data.find(terminator, self.start, self.end)
+                if idx >= 0 and (stop < 0 or idx < stop):
+                    stop = idx
+
+            if stop < 0:
+                return None
+
+            # keep `;` as part of the frame, drop the line break
+            tail = stop + 1 if self.data[stop] == FRAME_TERMINATORS[0][0] else stop
+            frame = str(self.view[self.start : tail], 'utf-8').strip()
+
+            self.start = stop + 1
+            if self.start == self.end:
+                self.clear()
+
+            if frame:
+                return frame
+
+        return None
+
+
+class SendBuffer:
+    """Reusable outgoing buffer, packs commands as newline terminated lines so a batch leaves in one write."""
+
+    def __init__(self, size=256):
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+
+    def pack(self, cmds) -> memoryview:
+        end = 0
+        for cmd in cmds:
+            line = cmd.encode()
+            stop = end + len(line)
+            if stop >= len(self.data):
+                # a fresh bytearray, the old one may still be exported through a view
+                data = bytearray(max(len(self.data) * 2, stop + 1))
+                data[:end] = self.view[:end]
+                self.data = data
+                self.view = memoryview(data)
+
+            self.view[end:stop] = line
+            self.data[stop] = 0x0A
+            end = stop + 1
+
+        return self.view[:end]
+
+
+class IOReactor:
+    """One selector for every device link, whichever caller polls reads all ready descriptors.
+
+    Each link frames what it reads into its own buffer, so a caller waiting on one link also
+    keeps the others drained and no reader threads are needed.
+    """
+
     def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        # guards the link buffers, never held while waiting in `select`
+        self.lock = threading.Lock()
+
+    def register(self, fileobj, callback) -> None:
+        try:
+            self.selector.register(fileobj, selectors.EVENT_READ, callback)
+        except KeyError:
+            self.selector.modify(fileobj, selectors.EVENT_READ, callback)
+
+    def unregister(self, fileobj) -> None:
+        try:
+            self.selector.unregister(fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def poll(self, deadline: float | None = None) -> bool:
+        """Wait until a descriptor is ready or the `monotonic()` deadline passes, then read them."""
+        timeout = None if deadline is None else max(deadline - monotonic(), 0)
+        events = self.selector.select(timeout)
+
+        for key, mask in events:
+            if mask & selectors.EVENT_READ:
+                with self.lock:
+                    key.data()
+        return bool(events)
+
+    def wait_writable(self, fileobj, deadline: float | None = None) -> bool:
+        """Wait until `fileobj` takes more bytes, reading the other links meanwhile, False past the deadline."""
+        callback = self.selector.get_key(fileobj).data
+        self.selector.modify(fileobj, selectors.EVENT_READ | selectors.EVENT_WRITE, callback)
+
+        try:
+            while True:
+                timeout = None if deadline is None else max(deadline - monotonic(), 0)
+                writable = False
+                for key, mask in self.selector.select(timeout):
+                    if mask & selectors.EVENT_READ:
+                        with self.lock:
+                            key.data()
+                    writable = writable or (key.fileobj is fileobj and mask & selectors.EVENT_WRITE)
+
+                if writable:
+                    return True
+                if deadline is not None and monotonic() >= deadline:
+                    return False
+
+        finally:
+            self.selector.modify(fileobj, selectors.EVENT_READ, callback)
+
+    def wait_frame(self, link, deadline: float | None) -> str:
+        # an empty string means the deadline passed or the link closed
+        done = False
+        while True:
+            with self.lock:
+                frame = link.frames.pop()
+            if frame is not None:
+                return frame
+            if done or not link.conn:
+                return ''
+
+            done = not self.poll(deadline) or (deadline is not None and monotonic() >= deadline)
+
+
+class SocketConn:
+    def __init__(self, buffer_size=1024, timeout: float | None = None, reactor: IOReactor | None = None):
         self.conn = None
+        self.timeout = timeout
+        self.capture = None
+        self.frames = FrameBuffer(buffer_size)
+        self.outgoing = SendBuffer()
+        self.reactor = reactor or IOReactor()
         self.status = ConnStatus.DISCONNECTED
 
     def connect(self, address) -> None:
@@ -20,79 +195,435 @@ class SocketConn:
         self.conn.connect(address)
 
         if self.conn:
+            self.reactor.register(self.conn, self.pump)
             self.status = ConnStatus.CONNECTED
 
+    def watch(self, callback) -> None:
+        # hand the socket to another reader, e.g. the feedback ring instead of the frame buffer
+        if self.conn:
+            self.reactor.register(self.conn, callback)
+
     def disconnect(self) -> None:
         if self.conn:
+            self.reactor.unregister(self.conn)
+            # wake any thread still blocked on the socket before closing it
+            try:
+                self.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self.conn.close()
             self.conn = None
+            self.frames.clear()
             self.status = ConnStatus.DISCONNECTED
 
+            if self.capture:
+                self.capture.flush()
+
     def send(self, data: str) -> None:
-        if self.conn:
-            self.conn.sendall(data.encode() + b'\n')
+        self.send_many((data,))
 
-    def recv(self, buffer_size=1024) -> str:
+    def send_many(self, cmds) -> None:
         if self.conn:
-            return self.conn.recv(buffer_size).decode()
-        return ''
+            payload = self.outgoing.pack(cmds)
+            self.conn.sendall(payload)
+
+            if self.capture:
+                self.capture.record(WireCapture.SENT, payload)
+
+    def recv_into(self, buffer, flags=0) -> int:
+        size = self.conn.recv_into(buffer, 0, flags) if self.conn else 0
+
+        if self.capture and size:
+            self.capture.record(WireCapture.RECV, buffer[:size])
+        return size
+
+    def pump(self) -> None:
+        try:
+            size = self.recv_into(self.frames.free(), socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
+
+        if not size:
+            # the peer closed the socket, callers see it through `status`
+            self.disconnect()
+            return
+        self.frames.commit(size)
+
+    def recv(self, timeout: float | None = None) -> str:
+        # return exactly one frame, leftover bytes stay buffered for the next call,
+        # an empty string means the deadline passed or the peer closed the socket
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else monotonic() + timeout
+
+        return self.reactor.wait_frame(self, deadline)
 
 
 class SerialConn:
-    def __init__(self, name, handle=print):
+    def __init__(self, name, handle=print, timeout: float | None = 10, reactor: IOReactor | None = None):
         self.name = name
         self.conn = None
-        self.thread = None
         self.handle = handle
-        self.data_queue = queue.Queue()
+        self.timeout = timeout
+        self.capture = None
+        self.frames = FrameBuffer()
+        self.outgoing = SendBuffer()
+        self.reactor = reactor or IOReactor()
         self.status = ConnStatus.DISCONNECTED
 
     def connect(self, address) -> None:
-        # here we can use the uart module from maix,
-        # but for universality, we use serial module
-
-        self.conn = uart.UART(port=address, baudrate=115200)
-
-        if not (self.conn and self.conn.is_open):
-            raise ConnectionError(f'Failed to open serial port: {address}')
+        # the tty is opened directly instead of through maix.uart,
+        # so it has a descriptor to wait on and works on any linux host
+        try:
+            self.conn = os.fdopen(open_tty(address), 'r+b', buffering=0)
+        except OSError as e:
+            raise ConnectionError(f'Failed to open serial port: {address}') from e
 
+        self.reactor.register(self.conn, self.pump)
         self.status = ConnStatus.CONNECTED
-        self.thread = threading.Thread(target=self._read_loop, daemon=True)
-        self.thread.start()
-
-    def _read_loop(self):
-        while self.status == ConnStatus.CONNECTED and self.conn:
-            byte = self.conn.read()
-            if not byte:
-                continue
-            self.data_queue.put(byte.decode())
 
     def disconnect(self) -> None:
         if self.conn and self.status:
-            self.thread = None
+            self.reactor.unregister(self.conn)
             self.conn.close()
             self.conn = None
+            self.frames.clear()
             self.status = ConnStatus.DISCONNECTED
 
+            if self.capture:
+                self.capture.flush()
+
     def send(self, data: str) -> None:
-        if self.conn and self.conn.is_open:
-            self.conn.write(data.encode() + b'\n')
+        self.send_many((data,))
 
-        self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+    def send_many(self, cmds) -> None:
+        # packed and then logged, a generator would only make it through the first pass
+        cmds = list(cmds)
+        if self.conn:
+            payload = self.outgoing.pack(cmds)
 
-    def recv(self) -> str:
-        try:
-            data = self.data_queue.get(True, 10)
+            if self.capture:
+                self.capture.record(WireCapture.SENT, payload)
 
-            if not data:
-                return ''
+            deadline = None if self.timeout is None else monotonic() + self.timeout
+            while payload:
+                # the descriptor is non-blocking, a full output queue writes nothing
+                size = self.conn.write(payload)
+                if size is None:
+                    if not self.reactor.wait_writable(self.conn, deadline):
+                        raise TimeoutError(f'{self.name} output stalled for {self.timeout}s.')
+                    continue
+                payload = payload[size:]
+
+        for data in cmds:
+            self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+
+    def pump(self) -> None:
+        if not self.conn:
+            return
 
-            data = data.strip()
+        buffer = self.frames.free()
+        size = self.conn.readinto(buffer)
+        if size:
+            if self.capture:
+                self.capture.record(WireCapture.RECV, buffer[:size])
+            self.frames.commit(size)
+
+    def recv(self, timeout: float | None = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else monotonic() + timeout
+
+        data = self.reactor.wait_frame(self, deadline)
+        if data:
             self.handle(f'-- [I] [Camera] <-- [{self.name}] {data}')
-            return data
-        except queue.Empty:
+        return data
+
+
+class WireCapture:
+    """Binary log of raw link traffic, each chunk is a `<dBI` header then its bytes.
+
+    The file stays open while traffic comes in, `close()` or leaving a `with` block flushes and closes it.
+    """
+
+    SENT = 0
+    RECV = 1
+
+    HEADER = struct.Struct('<dBI')
+
+    def __init__(self, path, buffering=1 << 16):
+        # held across calls on purpose, closed by `close()`
+        self.file = open(path, 'wb', buffering=buffering)  # noqa: SIM115
+        self.origin = monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record(self, direction: int, data) -> None:
+        self.file.write(self.HEADER.pack(monotonic() - self.origin, direction, len(data)))
+        self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    @classmethod
+    def load(cls, path) -> list:
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        events = []
+        offset = 0
+        while offset + cls.HEADER.size <= len(data):
+            stamp, direction, size = cls.HEADER.unpack_from(data, offset)
+            offset += cls.HEADER.size
+            events.append((stamp, direction, data[offset : offset + size]))
+            offset += size
+
+        return events
+
+
+class ReplayConn:
+    """Plays a `WireCapture` log back in place of a socket or serial connection.
+
+    Received bytes are released in recorded order and never ahead of the sends that preceded
+    them, `speed=None` replays as fast as possible, `speed=1` at the recorded pace.
+    """
+
+    def __init__(self, path, name=None, handle=print, speed: float | None = None):
+        self.path = path
+        self.name = name
+        self.handle = handle
+        self.speed = speed
+        self.events = WireCapture.load(path)
+        # next event handed to readers, and past the last recorded send matched so far
+        self.cursor = 0
+        self.sent = 0
+        self.leftover = b''
+        self.origin = 0.0
+        self.frames = FrameBuffer()
+        self.outgoing = SendBuffer()
+        # nothing to select on, only lends its lock to readers that share buffers with pollers
+        self.reactor = IOReactor()
+        self.status = ConnStatus.DISCONNECTED
+
+    def connect(self, address=None) -> None:
+        self.cursor = self.sent = 0
+        self.leftover = b''
+        self.origin = monotonic()
+        self.frames.clear()
+        self.status = ConnStatus.CONNECTED
+
+    def disconnect(self) -> None:
+        self.status = ConnStatus.DISCONNECTED
+
+    def watch(self, callback) -> None:
+        # nothing becomes ready by itself, readers pump on demand
+        pass
+
+    def _pace(self, stamp: float) -> None:
+        if self.speed:
+            delay = self.origin + stamp / self.speed - monotonic()
+            if delay > 0:
+                sleep(delay)
+
+    def send(self, data: str) -> None:
+        self.send_many((data,))
+
+    def send_many(self, cmds) -> None:
+        # match the next recorded send, a diverging client only gets a warning,
+        # received chunks recorded before it stay queued for the reader
+        cmds = list(cmds)
+        payload = bytes(self.outgoing.pack(cmds))
+        while self.sent < len(self.events) and self.events[self.sent][1] != WireCapture.SENT:
+            self.sent += 1
+        if self.sent < len(self.events):
+            chunk = self.events[self.sent][2]
+            self.sent += 1
+            if chunk != payload:
+                self.handle(f'-- [W] [Replay] sent {payload!r}, recorded {chunk!r}')
+
+        if self.name:
+            for data in cmds:
+                self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+
+    def _skip_sent(self) -> None:
+        # recorded sends the client has already made no longer hold back what was received after them
+        while self.cursor < self.sent and self.events[self.cursor][1] == WireCapture.SENT:
+            self.cursor += 1
+
+    def _next_chunk(self):
+        if self.leftover:
+            chunk, self.leftover = self.leftover, b''
+            return chunk
+
+        self._skip_sent()
+        if self.cursor >= len(self.events):
+            return None
+
+        stamp, direction, chunk = self.events[self.cursor]
+        if direction != WireCapture.RECV:
+            return None
+
+        self.cursor += 1
+        self._pace(stamp)
+        return memoryview(chunk)
+
+    def ready(self) -> bool:
+        if self.leftover:
+            return True
+        self._skip_sent()
+        if self.cursor >= len(self.events):
+            return False
+
+        stamp, direction, _ = self.events[self.cursor]
+        return direction == WireCapture.RECV and (not self.speed or monotonic() >= self.origin + stamp / self.speed)
+
+    def recv_into(self, buffer, flags=0) -> int:
+        # like a socket, a non-blocking read of bytes that are not due yet raises
+        if flags & socket.MSG_DONTWAIT and self.cursor < len(self.events) and not self.ready():
+            raise BlockingIOError('No recorded bytes due yet.')
+
+        chunk = self._next_chunk()
+        if chunk is None:
+            return 0
+
+        size = min(len(chunk), len(buffer))
+        buffer[:size] = chunk[:size]
+        self.leftover = chunk[size:]
+        return size
+
+    def recv(self, timeout: float | None = None) -> str:
+        while self.status:
+            data = self.frames.pop()
+            if data is not None:
+                if self.name:
+                    self.handle(f'-- [I] [Camera] <-- [{self.name}] {data}')
+                return data
+
+            chunk = self._next_chunk()
+            if chunk is None:
+                return ''
+            self.frames.feed(chunk)
+
+        return ''
+
+
+def open_tty(address, baudrate=115200) -> int:
+    # raw 8N1 without modem control, reads never block
+    fd = os.open(address, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    attrs = termios.tcgetattr(fd)
+
+    attrs[0] = 0
+    attrs[1] = 0
+    attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL
+    attrs[3] = 0
+    attrs[4] = attrs[5] = getattr(termios, f'B{baudrate}')
+    attrs[6][termios.VMIN] = 0
+    attrs[6][termios.VTIME] = 0
+
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    return fd
+
+
+async def read_frame(reader: asyncio.StreamReader) -> str:
+    while True:
+        try:
+            chunk = await reader.readuntil(FRAME_TERMINATORS)
+        except asyncio.IncompleteReadError:
             return ''
 
+        # keep `;` as part of the frame, drop the line break
+        frame = chunk.decode().strip()
+        if frame:
+            return frame
+
+
+class AsyncSocketConn:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.status = ConnStatus.DISCONNECTED
+
+    async def connect(self, address) -> None:
+        self.reader, self.writer = await asyncio.open_connection(*address)
+        self.status = ConnStatus.CONNECTED
+
+    async def disconnect(self) -> None:
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.reader = self.writer = None
+            self.status = ConnStatus.DISCONNECTED
+
+    async def send(self, data: str) -> None:
+        await self.send_many((data,))
+
+    async def send_many(self, cmds) -> None:
+        if self.writer:
+            # the transport gathers the parts into a single sendmsg
+            self.writer.writelines([part for cmd in cmds for part in (cmd.encode(), b'\n')])
+            await self.writer.drain()
+
+    async def recv(self) -> str:
+        return await read_frame(self.reader) if self.reader else ''
+
+
+class AsyncSerialConn:
+    def __init__(self, name, handle=print):
+        self.name = name
+        self.handle = handle
+        self.reader = None
+        self.writer = None
+        self.transport = None
+        self.status = ConnStatus.DISCONNECTED
+
+    async def connect(self, address) -> None:
+        loop = asyncio.get_running_loop()
+        fd = open_tty(address)
+
+        # a tty is a character device, so the pipe transports can drive it directly,
+        # the writer gets its own descriptor since each transport closes the one it owns
+        self.reader = asyncio.StreamReader()
+        self.transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(self.reader), os.fdopen(fd, 'rb', buffering=0)
+        )
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, os.fdopen(os.dup(fd), 'wb', buffering=0)
+        )
+        self.writer = asyncio.StreamWriter(transport, protocol, self.reader, loop)
+
+        self.status = ConnStatus.CONNECTED
+
+    async def disconnect(self) -> None:
+        if self.writer and self.status:
+            self.writer.close()
+            self.transport.close()
+            self.reader = self.writer = self.transport = None
+            self.status = ConnStatus.DISCONNECTED
+
+    async def send(self, data: str) -> None:
+        await self.send_many((data,))
+
+    async def send_many(self, cmds) -> None:
+        cmds = list(cmds)
+        if self.writer:
+            self.writer.writelines([part for cmd in cmds for part in (cmd.encode(), b'\n')])
+            await self.writer.drain()
+
+        for data in cmds:
+            self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+
+    async def recv(self) -> str:
+        data = await read_frame(self.reader) if self.reader else ''
+
+        if data:
+            self.handle(f'-- [I] [Camera] <-- [{self.name}] {data}')
+        return data
+
 
 if __name__ == '__main__':
     serial_conn = SerialConn('uart0')
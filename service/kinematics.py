@@ -0,0 +1,256 @@
+"""Forward and inverse kinematics of the arm on the host, pure Python so it runs on the MaixCAM as is.
+
+Joints are in degrees. Poses follow the controller, x, y, z in mm and rx, ry, rz in degrees with the
+orientation `Rz(rz) @ Ry(ry) @ Rx(rx)`, in the base frame without user or tool offsets.
+
+    arm = Arm()
+    pose = arm.fk([-170, -30, -90, -60, -80, 0])
+    joints = arm.ik(arm.offset(pose, [0, -70, 0, 0, 0, 0]), near=[-170, -30, -90, -60, -80, 0])
+"""
+
+from math import atan2, cos, degrees, hypot, radians, sin, sqrt
+from typing import NamedTuple
+
+from dobot import JointVector, Pose
+
+
+class DH(NamedTuple):
+    """One link in standard Denavit-Hartenberg form, lengths in mm and angles in degrees."""
+
+    a: float
+    alpha: float
+    d: float
+    # added to the joint reading to get the DH angle
+    offset: float = 0.0
+
+
+# nominal table of the CR5, run `cross_check` against the arm in use before trusting another model with it
+CR5 = (
+    DH(0, 90, 147),
+    DH(-427, 0, 0, -90),
+    DH(-357, 0, 0),
+    DH(0, 90, 141, -90),
+    DH(0, -90, 116),
+    DH(0, 0, 105),
+)
+
+# three rows of four of a homogeneous transform, the constant last row is left out
+Transform = tuple[tuple[float, ...], ...]
+
+IDENTITY = ((1.0, 0.0, 0.0, 0.0), (0.0, 1.0, 0.0, 0.0), (0.0, 0.0, 1.0, 0.0))
+
+
+def compose(A: Transform, B: Transform) -> Transform:
+    (a00, a01, a02, a03), (a10, a11, a12, a13), (a20, a21, a22, a23) = A
+    (b00, b01, b02, b03), (b10, b11, b12, b13), (b20, b21, b22, b23) = B
+    return (
+        (
+            a00 * b00 + a01 * b10 + a02 * b20,
+            a00 * b01 + a01 * b11 + a02 * b21,
+            a00 * b02 + a01 * b12 + a02 * b22,
+            a00 * b03 + a01 * b13 + a02 * b23 + a03,
+        ),
+        (
+            a10 * b00 + a11 * b10 + a12 * b20,
+            a10 * b01 + a11 * b11 + a12 * b21,
+            a10 * b02 + a11 * b12 + a12 * b22,
+            a10 * b03 + a11 * b13 + a12 * b23 + a13,
+        ),
+        (
+            a20 * b00 + a21 * b10 + a22 * b20,
+            a20 * b01 + a21 * b11 + a22 * b21,
+            a20 * b02 + a21 * b12 + a22 * b22,
+            a20 * b03 + a21 * b13 + a22 * b23 + a23,
+        ),
+    )
+
+
+def pose_to_transform(pose) -> Transform:
+    x, y, z, rx, ry, rz = pose
+    cx, sx = cos(radians(rx)), sin(radians(rx))
+    cy, sy = cos(radians(ry)), sin(radians(ry))
+    cz, sz = cos(radians(rz)), sin(radians(rz))
+    return (
+        (cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx, x),
+        (sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx, y),
+        (-sy, cy * sx, cy * cx, z),
+    )
+
+
+def transform_to_pose(T: Transform) -> Pose:
+    (r00, r01, _, x), (r10, r11, _, y), (r20, r21, r22, z) = T
+    cy = hypot(r00, r10)
+    if cy > 1e-9:
+        rx, ry, rz = atan2(r21, r22), atan2(-r20, cy), atan2(r10, r00)
+    else:
+        # gimbal lock at ry = +-90, only rz - rx is defined so rx is pinned to zero
+        rx, ry, rz = 0.0, atan2(-r20, cy), atan2(-r01, r11)
+    return Pose((x, y, z, degrees(rx), degrees(ry), degrees(rz)))
+
+
+def rotation_error(A: Transform, B: Transform) -> float:
+    """Angle in degrees of the rotation taking `A`'s orientation to `B`'s."""
+    trace = sum(A[0][i] * B[0][i] + A[1][i] * B[1][i] + A[2][i] * B[2][i] for i in range(3))
+    return degrees(atan2(sqrt(max(0.0, (3 - trace) * (1 + trace))), trace - 1))
+
+
+def solve(A: list, b: list) -> list:
+    # gaussian elimination with partial pivoting, `A` and `b` are consumed
+    n = len(b)
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda row: abs(A[row][col]))
+        A[col], A[pivot] = A[pivot], A[col]
+        b[col], b[pivot] = b[pivot], b[col]
+
+        head = A[col][col]
+        for row in range(col + 1, n):
+            factor = A[row][col] / head
+            if factor:
+                Ar, Ac = A[row], A[col]
+                for k in range(col, n):
+                    Ar[k] -= factor * Ac[k]
+                b[row] -= factor * b[col]
+
+    x = [0.0] * n
+    for row in reversed(range(n)):
+        x[row] = (b[row] - sum(A[row][k] * x[k] for k in range(row + 1, n))) / A[row][row]
+    return x
+
+
+class Arm:
+    """Serial arm described by a DH table, with an optional tool transform given as a pose on the flange."""
+
+    # rotation residuals are weighted as if they were position errors at this distance in mm
+    REACH = 100.0
+
+    def __init__(self, dh=CR5, tool=None, limits=None):
+        self.dh = tuple(dh)
+        self.tool = pose_to_transform(tool) if tool is not None else None
+        # (low, high) in degrees per joint, `None` leaves the joints unbounded
+        self.limits = limits
+        self.links = [(link.a, cos(radians(link.alpha)), sin(radians(link.alpha)), link.d) for link in self.dh]
+
+    def frames(self, joints) -> list:
+        # base frame followed by the frame after every link, the tool applied to the last
+        T = IDENTITY
+        frames = [T]
+        for (a, ca, sa, d), link, q in zip(self.links, self.dh, joints):
+            theta = radians(q + link.offset)
+            ct, st = cos(theta), sin(theta)
+            T = compose(T, ((ct, -st * ca, st * sa, a * ct), (st, ct * ca, -ct * sa, a * st), (0.0, sa, ca, d)))
+            frames.append(T)
+
+        if self.tool is not None:
+            frames[-1] = compose(frames[-1], self.tool)
+        return frames
+
+    def transform(self, joints) -> Transform:
+        return self.frames(joints)[-1]
+
+    def fk(self, joints) -> Pose:
+        """Pose of the tool for the given joints, what `PositiveKin` answers."""
+        return transform_to_pose(self.transform(joints))
+
+    def fk_many(self, batch) -> list[Pose]:
+        return [transform_to_pose(self.transform(joints)) for joints in batch]
+
+    def jacobian(self, joints) -> list:
+        """Geometric jacobian, rows vx, vy, vz in mm and wx, wy, wz per radian of each joint."""
+        frames = self.frames(joints)
+        px, py, pz = frames[-1][0][3], frames[-1][1][3], frames[-1][2][3]
+
+        columns = []
+        for T in frames[:-1]:
+            zx, zy, zz = T[0][2], T[1][2], T[2][2]
+            dx, dy, dz = px - T[0][3], py - T[1][3], pz - T[2][3]
+            columns.append((zy * dz - zz * dy, zz * dx - zx * dz, zx * dy - zy * dx, zx, zy, zz))
+        return [list(row) for row in zip(*columns)]
+
+    def ik(self, pose, near=None, tol=1e-3, iterations=100, damping=0.5) -> JointVector:
+        """Joints reaching `pose` by damped least squares, starting from and ending closest to `near`.
+
+        Raises `ValueError` when no solution within `tol` mm (and the matching angle) is found,
+        i.e. the pose is out of reach or beyond the joint limits.
+        """
+        target = pose_to_transform(pose)
+        q = [float(v) for v in (near if near is not None else [0.0] * len(self.dh))]
+        scale = self.REACH
+        lam2 = damping * damping
+
+        for _ in range(iterations):
+            T = self.transform(q)
+            error = [target[i][3] - T[i][3] for i in range(3)]
+            # orientation residual, half the sum of the axis cross products, small angle accurate
+            w = [0.0, 0.0, 0.0]
+            for k in range(3):
+                cx, cy, cz = T[0][k], T[1][k], T[2][k]
+                tx, ty, tz = target[0][k], target[1][k], target[2][k]
+                w[0] += (cy * tz - cz * ty) / 2
+                w[1] += (cz * tx - cx * tz) / 2
+                w[2] += (cx * ty - cy * tx) / 2
+            error += [v * scale for v in w]
+
+            if max(abs(v) for v in error) < tol:
+                return JointVector(self.clamp(q, strict=True))
+
+            J = self.jacobian(q)
+            J[3:] = [[v * scale for v in row] for row in J[3:]]
+
+            # dq = J^T (J J^T + lambda^2 I)^-1 e
+            JJt = [[sum(a * b for a, b in zip(J[i], J[j])) for j in range(6)] for i in range(6)]
+            for i in range(6):
+                JJt[i][i] += lam2
+            y = solve(JJt, error)
+            step = [sum(J[i][k] * y[i] for i in range(6)) for k in range(len(q))]
+            q = self.clamp([qk + degrees(dk) for qk, dk in zip(q, step)])
+
+        raise ValueError(f'No joint solution for {Pose(pose)}.')
+
+    def ik_many(self, poses, near=None) -> list[JointVector]:
+        # every solution seeds the next, which keeps a densely sampled path on one branch
+        solutions = []
+        for pose in poses:
+            near = self.ik(pose, near)
+            solutions.append(near)
+        return solutions
+
+    def clamp(self, joints: list, strict=False) -> list:
+        if self.limits is None:
+            return joints
+
+        clamped = [min(max(q, low), high) for q, (low, high) in zip(joints, self.limits)]
+        if strict and clamped != joints:
+            raise ValueError(f'Joints {JointVector(joints)} beyond limits.')
+        return clamped
+
+    def reachable(self, pose, near=None) -> bool:
+        try:
+            self.ik(pose, near)
+        except ValueError:
+            return False
+        return True
+
+    @staticmethod
+    def offset(pose, offset) -> Pose:
+        """Apply `offset` in the tool frame of `pose`, what `RelPointTool` answers."""
+        return transform_to_pose(compose(pose_to_transform(pose), pose_to_transform(offset)))
+
+
+def cross_check(dobot, arm: Arm, samples) -> tuple[float, float]:
+    """Largest position error in mm and orientation error in degrees of `arm.fk` against `PositiveKin`.
+
+    All samples are asked in one pipelined round trip, so a few dozen points cost about one exchange.
+    """
+    with dobot.pipeline() as results:
+        for joints in samples:
+            dobot.PositiveKin(*joints)
+
+    position = orientation = 0.0
+    for joints, remote in zip(samples, results):
+        if not isinstance(remote, Pose):
+            raise ConnectionError(f'No PositiveKin answer for {JointVector(joints)}.')
+
+        local, expected = arm.transform(joints), pose_to_transform(remote)
+        position = max(position, sqrt(sum((local[i][3] - expected[i][3]) ** 2 for i in range(3))))
+        orientation = max(orientation, rotation_error(local, expected))
+    return position, orientation
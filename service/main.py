@@ -1,14 +1,25 @@
 from maix import app, display, image, pinmap, time, touchscreen
 
-from functools import wraps
-from inspect import signature
+import builtins
+import json
+import re
+from array import array
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from copy import deepcopy
+from functools import partial, wraps
+from inspect import Parameter, signature
+from typing import NamedTuple
 
 # from conn import SerialConn, SocketConn
-import queue
+import asyncio
+import os
+import selectors
 import socket
+import struct
+import termios
 import threading
-
-from maix import uart
+from time import monotonic, sleep
 
 
 class ConnStatus:
@@ -16,9 +27,181 @@ class ConnStatus:
     DISCONNECTED = False
 
 
-class SocketConn:
+# dobot replies end with `;` and esp32 lines end with `\n`
+FRAME_TERMINATORS = (b';', b'\n')
+
+
+class FrameBuffer:
+    def __init__(self, size=1024):
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+        self.start = 0
+        self.end = 0
+
+    def reserve(self, size: int) -> None:
+        if len(self.data) - self.end >= size:
+            return
+
+        # move the unread tail to the front, grow only if it still does not fit
+        pending = self.end - self.start
+        if pending + size > len(self.data):
+            data = bytearray(max(len(self.data) * 2, pending + size))
+            data[:pending] = self.view[self.start : self.end]
+            self.data = data
+            self.view = memoryview(data)
+        else:
+            self.view[:pending] = self.view[self.start : self.end]
+
+        self.start = 0
+        self.end = pending
+
+    def clear(self) -> None:
+        self.start = self.end = 0
+
+    def feed(self, chunk: bytes) -> None:
+        size = len(chunk)
+        self.reserve(size)
+        self.data[self.end : self.end + size] = chunk
+        self.end += size
+
+    def free(self, size=1) -> memoryview:
+        self.reserve(size)
+        return self.view[self.end :]
+
+    def commit(self, size: int) -> None:
+        self.end += size
+
+    def pop(self) -> str | None:
+        while self.start < self.end:
+            stop = -1
+            for terminator in FRAME_TERMINATORS:
+                idx = self.data.find(terminator, self.start, self.end)
+                if idx >= 0 and (stop < 0 or idx < stop):
+                    stop = idx
+
+            if stop < 0:
+                return None
+
+            # keep `;` as part of the frame, drop the line break
+            tail = stop + 1 if self.data[stop] == FRAME_TERMINATORS[0][0] else stop
+            frame = str(self.view[self.start : tail], 'utf-8').strip()
+
+            self.start = stop + 1
+            if self.start == self.end:
+                self.clear()
+
+            if frame:
+                return frame
+
+        return None
+
+
+class SendBuffer:
+    """Reusable outgoing buffer, packs commands as newline terminated lines so a batch leaves in one write."""
+
+    def __init__(self, size=256):
+        self.data = bytearray(size)
+        self.view = memoryview(self.data)
+
+    def pack(self, cmds) -> memoryview:
+        end = 0
+        for cmd in cmds:
+            line = cmd.encode()
+            stop = end + len(line)
+            if stop >= len(self.data):
+                # a fresh bytearray, the old one may still be exported through a view
+                data = bytearray(max(len(self.data) * 2, stop + 1))
+                data[:end] = self.view[:end]
+                self.data = data
+                self.view = memoryview(data)
+
+            self.view[end:stop] = line
+            self.data[stop] = 0x0A
+            end = stop + 1
+
+        return self.view[:end]
+
+
+class IOReactor:
+    """One selector for every device link, whichever caller polls reads all ready descriptors.
+
+    Each link frames what it reads into its own buffer, so a caller waiting on one link also
+    keeps the others drained and no reader threads are needed.
+    """
+
     def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        # guards the link buffers, never held while waiting in `select`
+        self.lock = threading.Lock()
+
+    def register(self, fileobj, callback) -> None:
+        try:
+            self.selector.register(fileobj, selectors.EVENT_READ, callback)
+        except KeyError:
+            self.selector.modify(fileobj, selectors.EVENT_READ, callback)
+
+    def unregister(self, fileobj) -> None:
+        try:
+            self.selector.unregister(fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def poll(self, deadline: float | None = None) -> bool:
+        """Wait until a descriptor is ready or the `monotonic()` deadline passes, then read them."""
+        timeout = None if deadline is None else max(deadline - monotonic(), 0)
+        events = self.selector.select(timeout)
+
+        for key, mask in events:
+            if mask & selectors.EVENT_READ:
+                with self.lock:
+                    key.data()
+        return bool(events)
+
+    def wait_writable(self, fileobj, deadline: float | None = None) -> bool:
+        """Wait until `fileobj` takes more bytes, reading the other links meanwhile, False past the deadline."""
+        callback = self.selector.get_key(fileobj).data
+        self.selector.modify(fileobj, selectors.EVENT_READ | selectors.EVENT_WRITE, callback)
+
+        try:
+            while True:
+                timeout = None if deadline is None else max(deadline - monotonic(), 0)
+                writable = False
+                for key, mask in self.selector.select(timeout):
+                    if mask & selectors.EVENT_READ:
+                        with self.lock:
+                            key.data()
+                    writable = writable or (key.fileobj is fileobj and mask & selectors.EVENT_WRITE)
+
+                if writable:
+                    return True
+                if deadline is not None and monotonic() >= deadline:
+                    return False
+
+        finally:
+            self.selector.modify(fileobj, selectors.EVENT_READ, callback)
+
+    def wait_frame(self, link, deadline: float | None) -> str:
+        # an empty string means the deadline passed or the link closed
+        done = False
+        while True:
+            with self.lock:
+                frame = link.frames.pop()
+            if frame is not None:
+                return frame
+            if done or not link.conn:
+                return ''
+
+            done = not self.poll(deadline) or (deadline is not None and monotonic() >= deadline)
+
+
+class SocketConn:
+    def __init__(self, buffer_size=1024, timeout: float | None = None, reactor: IOReactor | None = None):
         self.conn = None
+        self.timeout = timeout
+        self.capture = None
+        self.frames = FrameBuffer(buffer_size)
+        self.outgoing = SendBuffer()
+        self.reactor = reactor or IOReactor()
         self.status = ConnStatus.DISCONNECTED
 
     def connect(self, address) -> None:
@@ -26,79 +209,434 @@ class SocketConn:
         self.conn.connect(address)
 
         if self.conn:
+            self.reactor.register(self.conn, self.pump)
             self.status = ConnStatus.CONNECTED
 
+    def watch(self, callback) -> None:
+        # hand the socket to another reader, e.g. the feedback ring instead of the frame buffer
+        if self.conn:
+            self.reactor.register(self.conn, callback)
+
     def disconnect(self) -> None:
         if self.conn:
+            self.reactor.unregister(self.conn)
+            # wake any thread still blocked on the socket before closing it
+            try:
+                self.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self.conn.close()
             self.conn = None
+            self.frames.clear()
             self.status = ConnStatus.DISCONNECTED
 
+            if self.capture:
+                self.capture.flush()
+
     def send(self, data: str) -> None:
-        if self.conn:
-            self.conn.sendall(data.encode() + b'\n')
+        self.send_many((data,))
 
-    def recv(self, buffer_size=1024) -> str:
+    def send_many(self, cmds) -> None:
         if self.conn:
-            return self.conn.recv(buffer_size).decode()
-        return ''
+            payload = self.outgoing.pack(cmds)
+            self.conn.sendall(payload)
+
+            if self.capture:
+                self.capture.record(WireCapture.SENT, payload)
+
+    def recv_into(self, buffer, flags=0) -> int:
+        size = self.conn.recv_into(buffer, 0, flags) if self.conn else 0
+
+        if self.capture and size:
+            self.capture.record(WireCapture.RECV, buffer[:size])
+        return size
+
+    def pump(self) -> None:
+        try:
+            size = self.recv_into(self.frames.free(), socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return
+
+        if not size:
+            # the peer closed the socket, callers see it through `status`
+            self.disconnect()
+            return
+        self.frames.commit(size)
+
+    def recv(self, timeout: float | None = None) -> str:
+        # return exactly one frame, leftover bytes stay buffered for the next call,
+        # an empty string means the deadline passed or the peer closed the socket
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else monotonic() + timeout
+
+        return self.reactor.wait_frame(self, deadline)
 
 
 class SerialConn:
-    def __init__(self, name, handle=print):
+    def __init__(self, name, handle=print, timeout: float | None = 10, reactor: IOReactor | None = None):
         self.name = name
         self.conn = None
-        self.thread = None
         self.handle = handle
-        self.data_queue = queue.Queue()
+        self.timeout = timeout
+        self.capture = None
+        self.frames = FrameBuffer()
+        self.outgoing = SendBuffer()
+        self.reactor = reactor or IOReactor()
         self.status = ConnStatus.DISCONNECTED
 
     def connect(self, address) -> None:
-        # here we can use the uart module from maix,
-        # but for universality, we use serial module
-
-        self.conn = uart.UART(port=address, baudrate=115200)
-
-        if not (self.conn and self.conn.is_open):
-            raise ConnectionError(f'Failed to open serial port: {address}')
+        # the tty is opened directly instead of through maix.uart,
+        # so it has a descriptor to wait on and works on any linux host
+        try:
+            self.conn = os.fdopen(open_tty(address), 'r+b', buffering=0)
+        except OSError as e:
+            raise ConnectionError(f'Failed to open serial port: {address}') from e
 
+        self.reactor.register(self.conn, self.pump)
         self.status = ConnStatus.CONNECTED
-        self.thread = threading.Thread(target=self._read_loop, daemon=True)
-        self.thread.start()
-
-    def _read_loop(self):
-        while self.status == ConnStatus.CONNECTED and self.conn:
-            byte = self.conn.read()
-            if not byte:
-                continue
-            self.data_queue.put(byte.decode())
 
     def disconnect(self) -> None:
         if self.conn and self.status:
-            self.thread = None
+            self.reactor.unregister(self.conn)
             self.conn.close()
             self.conn = None
+            self.frames.clear()
             self.status = ConnStatus.DISCONNECTED
 
+            if self.capture:
+                self.capture.flush()
+
     def send(self, data: str) -> None:
-        if self.conn and self.conn.is_open:
-            self.conn.write(data.encode() + b'\n')
+        self.send_many((data,))
 
-        self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+    def send_many(self, cmds) -> None:
+        # packed and then logged, a generator would only make it through the first pass
+        cmds = list(cmds)
+        if self.conn:
+            payload = self.outgoing.pack(cmds)
 
-    def recv(self) -> str:
-        try:
-            data = self.data_queue.get(True, 10)
+            if self.capture:
+                self.capture.record(WireCapture.SENT, payload)
 
-            if not data:
-                return ''
+            deadline = None if self.timeout is None else monotonic() + self.timeout
+            while payload:
+                # the descriptor is non-blocking, a full output queue writes nothing
+                size = self.conn.write(payload)
+                if size is None:
+                    if not self.reactor.wait_writable(self.conn, deadline):
+                        raise TimeoutError(f'{self.name} output stalled for {self.timeout}s.')
+                    continue
+                payload = payload[size:]
 
-            data = data.strip()
+        for data in cmds:
+            self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+
+    def pump(self) -> None:
+        if not self.conn:
+            return
+
+        buffer = self.frames.free()
+        size = self.conn.readinto(buffer)
+        if size:
+            if self.capture:
+                self.capture.record(WireCapture.RECV, buffer[:size])
+            self.frames.commit(size)
+
+    def recv(self, timeout: float | None = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else monotonic() + timeout
+
+        data = self.reactor.wait_frame(self, deadline)
+        if data:
             self.handle(f'-- [I] [Camera] <-- [{self.name}] {data}')
-            return data
-        except queue.Empty:
+        return data
+
+
+class WireCapture:
+    """Binary log of raw link traffic, each chunk is a `<dBI` header then its bytes.
+
+    The file stays open while traffic comes in, `close()` or leaving a `with` block flushes and closes it.
+    """
+
+    SENT = 0
+    RECV = 1
+
+    HEADER = struct.Struct('<dBI')
+
+    def __init__(self, path, buffering=1 << 16):
+        # held across calls on purpose, closed by `close()`
+        self.file = open(path, 'wb', buffering=buffering)  # noqa: SIM115
+        self.origin = monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record(self, direction: int, data) -> None:
+        self.file.write(self.HEADER.pack(monotonic() - self.origin, direction, len(data)))
+        self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    @classmethod
+    def load(cls, path) -> list:
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        events = []
+        offset = 0
+        while offset + cls.HEADER.size <= len(data):
+            stamp, direction, size = cls.HEADER.unpack_from(data, offset)
+            offset += cls.HEADER.size
+            events.append((stamp, direction, data[offset : offset + size]))
+            offset += size
+
+        return events
+
+
+class ReplayConn:
+    """Plays a `WireCapture` log back in place of a socket or serial connection.
+
+    Received bytes are released in recorded order and never ahead of the sends that preceded
+    them, `speed=None` replays as fast as possible, `speed=1` at the recorded pace.
+    """
+
+    def __init__(self, path, name=None, handle=print, speed: float | None = None):
+        self.path = path
+        self.name = name
+        self.handle = handle
+        self.speed = speed
+        self.events = WireCapture.load(path)
+        # next event handed to readers, and past the last recorded send matched so far
+        self.cursor = 0
+        self.sent = 0
+        self.leftover = b''
+        self.origin = 0.0
+        self.frames = FrameBuffer()
+        self.outgoing = SendBuffer()
+        # nothing to select on, only lends its lock to readers that share buffers with pollers
+        self.reactor = IOReactor()
+        self.status = ConnStatus.DISCONNECTED
+
+    def connect(self, address=None) -> None:
+        self.cursor = self.sent = 0
+        self.leftover = b''
+        self.origin = monotonic()
+        self.frames.clear()
+        self.status = ConnStatus.CONNECTED
+
+    def disconnect(self) -> None:
+        self.status = ConnStatus.DISCONNECTED
+
+    def watch(self, callback) -> None:
+        # nothing becomes ready by itself, readers pump on demand
+        pass
+
+    def _pace(self, stamp: float) -> None:
+        if self.speed:
+            delay = self.origin + stamp / self.speed - monotonic()
+            if delay > 0:
+                sleep(delay)
+
+    def send(self, data: str) -> None:
+        self.send_many((data,))
+
+    def send_many(self, cmds) -> None:
+        # match the next recorded send, a diverging client only gets a warning,
+        # received chunks recorded before it stay queued for the reader
+        cmds = list(cmds)
+        payload = bytes(self.outgoing.pack(cmds))
+        while self.sent < len(self.events) and self.events[self.sent][1] != WireCapture.SENT:
+            self.sent += 1
+        if self.sent < len(self.events):
+            chunk = self.events[self.sent][2]
+            self.sent += 1
+            if chunk != payload:
+                self.handle(f'-- [W] [Replay] sent {payload!r}, recorded {chunk!r}')
+
+        if self.name:
+            for data in cmds:
+                self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+
+    def _skip_sent(self) -> None:
+        # recorded sends the client has already made no longer hold back what was received after them
+        while self.cursor < self.sent and self.events[self.cursor][1] == WireCapture.SENT:
+            self.cursor += 1
+
+    def _next_chunk(self):
+        if self.leftover:
+            chunk, self.leftover = self.leftover, b''
+            return chunk
+
+        self._skip_sent()
+        if self.cursor >= len(self.events):
+            return None
+
+        stamp, direction, chunk = self.events[self.cursor]
+        if direction != WireCapture.RECV:
+            return None
+
+        self.cursor += 1
+        self._pace(stamp)
+        return memoryview(chunk)
+
+    def ready(self) -> bool:
+        if self.leftover:
+            return True
+        self._skip_sent()
+        if self.cursor >= len(self.events):
+            return False
+
+        stamp, direction, _ = self.events[self.cursor]
+        return direction == WireCapture.RECV and (not self.speed or monotonic() >= self.origin + stamp / self.speed)
+
+    def recv_into(self, buffer, flags=0) -> int:
+        # like a socket, a non-blocking read of bytes that are not due yet raises
+        if flags & socket.MSG_DONTWAIT and self.cursor < len(self.events) and not self.ready():
+            raise BlockingIOError('No recorded bytes due yet.')
+
+        chunk = self._next_chunk()
+        if chunk is None:
+            return 0
+
+        size = min(len(chunk), len(buffer))
+        buffer[:size] = chunk[:size]
+        self.leftover = chunk[size:]
+        return size
+
+    def recv(self, timeout: float | None = None) -> str:
+        while self.status:
+            data = self.frames.pop()
+            if data is not None:
+                if self.name:
+                    self.handle(f'-- [I] [Camera] <-- [{self.name}] {data}')
+                return data
+
+            chunk = self._next_chunk()
+            if chunk is None:
+                return ''
+            self.frames.feed(chunk)
+
+        return ''
+
+
+def open_tty(address, baudrate=115200) -> int:
+    # raw 8N1 without modem control, reads never block
+    fd = os.open(address, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    attrs = termios.tcgetattr(fd)
+
+    attrs[0] = 0
+    attrs[1] = 0
+    attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL
+    attrs[3] = 0
+    attrs[4] = attrs[5] = getattr(termios, f'B{baudrate}')
+    attrs[6][termios.VMIN] = 0
+    attrs[6][termios.VTIME] = 0
+
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    return fd
+
+
+async def read_frame(reader: asyncio.StreamReader) -> str:
+    while True:
+        try:
+            chunk = await reader.readuntil(FRAME_TERMINATORS)
+        except asyncio.IncompleteReadError:
             return ''
 
+        # keep `;` as part of the frame, drop the line break
+        frame = chunk.decode().strip()
+        if frame:
+            return frame
+
+
+class AsyncSocketConn:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.status = ConnStatus.DISCONNECTED
+
+    async def connect(self, address) -> None:
+        self.reader, self.writer = await asyncio.open_connection(*address)
+        self.status = ConnStatus.CONNECTED
+
+    async def disconnect(self) -> None:
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.reader = self.writer = None
+            self.status = ConnStatus.DISCONNECTED
+
+    async def send(self, data: str) -> None:
+        await self.send_many((data,))
+
+    async def send_many(self, cmds) -> None:
+        if self.writer:
+            # the transport gathers the parts into a single sendmsg
+            self.writer.writelines([part for cmd in cmds for part in (cmd.encode(), b'\n')])
+            await self.writer.drain()
+
+    async def recv(self) -> str:
+        return await read_frame(self.reader) if self.reader else ''
+
+
+class AsyncSerialConn:
+    def __init__(self, name, handle=print):
+        self.name = name
+        self.handle = handle
+        self.reader = None
+        self.writer = None
+        self.transport = None
+        self.status = ConnStatus.DISCONNECTED
+
+    async def connect(self, address) -> None:
+        loop = asyncio.get_running_loop()
+        fd = open_tty(address)
+
+        # a tty is a character device, so the pipe transports can drive it directly,
+        # the writer gets its own descriptor since each transport closes the one it owns
+        self.reader = asyncio.StreamReader()
+        self.transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(self.reader), os.fdopen(fd, 'rb', buffering=0)
+        )
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, os.fdopen(os.dup(fd), 'wb', buffering=0)
+        )
+        self.writer = asyncio.StreamWriter(transport, protocol, self.reader, loop)
+
+        self.status = ConnStatus.CONNECTED
+
+    async def disconnect(self) -> None:
+        if self.writer and self.status:
+            self.writer.close()
+            self.transport.close()
+            self.reader = self.writer = self.transport = None
+            self.status = ConnStatus.DISCONNECTED
+
+    async def send(self, data: str) -> None:
+        await self.send_many((data,))
+
+    async def send_many(self, cmds) -> None:
+        cmds = list(cmds)
+        if self.writer:
+            self.writer.writelines([part for cmd in cmds for part in (cmd.encode(), b'\n')])
+            await self.writer.drain()
+
+        for data in cmds:
+            self.handle(f'-- [I] [Camera] --> [{self.name}] {data}')
+
+    async def recv(self) -> str:
+        data = await read_frame(self.reader) if self.reader else ''
+
+        if data:
+            self.handle(f'-- [I] [Camera] <-- [{self.name}] {data}')
+        return data
 
 
 class DobotErrorCode:
@@ -123,13 +661,897 @@ class DobotErrorCode:
     OPT_PARAM_OVER_RANGE = -60000  # -6000X
 
 
+class DobotRobotMode:
+    INIT = 1
+    BRAKE_OPEN = 2
+    POWER_OFF = 3
+    DISABLED = 4
+    ENABLE = 5
+    BACKDRIVE = 6
+    RUNNING = 7
+    ERROR = 9
+    PAUSE = 10
+    JOG = 11
+
+
+class DobotChannel:
+    """Dobot connection channels, `ports` maps them to TCP ports beside the dashboard."""
+
+    DASHBOARD = 'dashboard'
+    MOTION = 'motion'
+    FEEDBACK = 'feedback'
+
+
+class FeedbackState:
+    """One realtime feedback packet, every field is read in place from the ring buffer."""
+
+    __slots__ = ('doubles', 'view')
+
+    SIZE = 1440
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.doubles = view.cast('d')
+
+    @property
+    def length(self) -> int:
+        return struct.unpack_from('<H', self.view, 0)[0]
+
+    @property
+    def digital_inputs(self) -> int:
+        return struct.unpack_from('<Q', self.view, 8)[0]
+
+    @property
+    def digital_outputs(self) -> int:
+        return struct.unpack_from('<Q', self.view, 16)[0]
+
+    @property
+    def robot_mode(self) -> int:
+        return struct.unpack_from('<Q', self.view, 24)[0]
+
+    @property
+    def timestamp(self) -> int:
+        return struct.unpack_from('<Q', self.view, 32)[0]
+
+    @property
+    def speed_scaling(self) -> float:
+        return self.doubles[8]
+
+    @property
+    def target_joints(self) -> memoryview:
+        return self.doubles[24:30]
+
+    @property
+    def joints(self) -> memoryview:
+        return self.doubles[54:60]
+
+    @property
+    def joint_speeds(self) -> memoryview:
+        return self.doubles[60:66]
+
+    @property
+    def pose(self) -> memoryview:
+        return self.doubles[78:84]
+
+    @property
+    def tcp_speed(self) -> memoryview:
+        return self.doubles[84:90]
+
+    @property
+    def target_pose(self) -> memoryview:
+        return self.doubles[96:102]
+
+    @property
+    def user(self) -> int:
+        return self.view[1012]
+
+    @property
+    def tool(self) -> int:
+        return self.view[1013]
+
+    @property
+    def enable_status(self) -> int:
+        return self.view[1026]
+
+    @property
+    def running_status(self) -> int:
+        return self.view[1028]
+
+    @property
+    def error_status(self) -> int:
+        return self.view[1029]
+
+    @property
+    def current_command_id(self) -> int:
+        return struct.unpack_from('<Q', self.view, 1112)[0]
+
+    @property
+    def force(self) -> memoryview:
+        return self.doubles[163:169]
+
+
+class DobotFeedback:
+    """Reader for the fixed-size realtime feedback stream, packets land in a preallocated ring."""
+
+    def __init__(self, conn, depth=16, handle=print):
+        self.conn = conn
+        self.handle = handle
+        self.depth = depth
+        self.ring = bytearray(FeedbackState.SIZE * depth)
+        self.view = memoryview(self.ring)
+        self.states = [
+            FeedbackState(self.view[i * FeedbackState.SIZE : (i + 1) * FeedbackState.SIZE]) for i in range(depth)
+        ]
+        self.count = 0
+        self.fill = 0
+
+    def start(self) -> None:
+        self.count = self.fill = 0
+        self.conn.watch(self.pump)
+
+    def pump(self) -> None:
+        # drain everything that arrived, the ring keeps the newest packets
+        try:
+            while self.conn.status:
+                self.read(socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.conn.disconnect()
+
+    def read(self, flags=0) -> bool:
+        slot = self.states[self.count % self.depth].view
+
+        size = self.conn.recv_into(slot[self.fill :], flags)
+        if not size:
+            raise OSError('Feedback stream closed.')
+
+        self.fill += size
+        if self.fill < FeedbackState.SIZE:
+            return False
+
+        self.fill = 0
+        if slot[0] | slot[1] << 8 == FeedbackState.SIZE:
+            self.count += 1
+            return True
+
+        # out of step with the stream, realign on the next length header
+        idx = bytes(slot[1:]).find(struct.pack('<H', FeedbackState.SIZE))
+        if idx >= 0:
+            slot[: FeedbackState.SIZE - 1 - idx] = slot[idx + 1 :]
+            self.fill = FeedbackState.SIZE - 1 - idx
+        self.handle('-- [W] [Feedback] realign feedback stream')
+        return False
+
+    def latest(self) -> FeedbackState | None:
+        with self.conn.reactor.lock:
+            self.pump()
+        return self.states[(self.count - 1) % self.depth] if self.count else None
+
+
+FLOAT_PRECISION = 4
+
+
+def format_arg(value) -> str:
+    # fixed-point floats without trailing zeros, `0.1 + 0.2` goes out as `0.3` and `1e-05` as `0`
+    if type(value) is float:
+        text = f'{value:.{FLOAT_PRECISION}f}'.rstrip('0').rstrip('.')
+        return '0' if text == '-0' else text
+    return str(value)
+
+
+# values are numbers, quoted strings, bare words or `{}`/`[]` groups of them
+VALUE_TOKEN = re.compile(
+    r'\s*(?:(?P<open>[{\[])|(?:(?P<close>[}\]])|"(?P<text>[^"]*)"|(?P<atom>[^,{}\[\]"]*?))'
+    r'\s*(?:,|(?=[}\]])|$))'
+)
+JSON_DECODER = json.JSONDecoder()
+
+
+def convert_atom(token: str):
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        return float(token)
+    except ValueError:
+        return token
+
+
+def scan_values(text: str, pos: int) -> tuple[list, int]:
+    # parse the group opening at `pos`, returns it with the index right after it
+    stack = []
+    while True:
+        m = VALUE_TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f'Unexpected character at {pos} in `{text}`.')
+        pos = m.end()
+
+        kind = m.lastgroup
+        if kind == 'open':
+            stack.append([])
+        elif kind == 'close':
+            group = stack.pop()
+            if not stack:
+                return group, m.end('close')
+            stack[-1].append(group)
+        elif kind == 'text':
+            stack[-1].append(m['text'])
+        elif m['atom']:
+            stack[-1].append(convert_atom(m['atom']))
+
+
+def parse_reply(res: str) -> tuple[int, list, str]:
+    """Split `ErrorID,{values},Cmd(args)` into the error code, the typed values and the echoed command.
+
+    Flat numeric replies take a single split, nested groups go through the C json scanner and
+    quoted strings or bare words through the regex scanner, nested groups come back as lists.
+    """
+    start = res.index(',')
+    err = int(res[:start])
+
+    stop = res.index('}', start)
+    body = res[start + 2 : stop]
+    if not ('{' in body or '[' in body or '"' in body):
+        try:
+            values = [float(p) if '.' in p else int(p) for p in body.split(',')] if body else []
+            return err, values, res[stop + 2 :]
+        except ValueError:
+            pass
+
+    try:
+        if '"' in body:
+            raise ValueError('Quoted values need the scanner.')
+        values, end = JSON_DECODER.raw_decode(res.replace('{', '[').replace('}', ']'), start + 1)
+    except ValueError:
+        values, end = scan_values(res, start + 1)
+
+    return err, values, res[end + 1 :]
+
+
+def parse_reply_into(res: str, out) -> tuple[int, int, str]:
+    """Like `parse_reply` for flat numeric replies, writes the values into the preallocated `out`."""
+    start = res.index(',')
+    stop = res.index('}', start)
+    err = int(res[:start])
+
+    count = 0
+    if stop > start + 2:
+        for count, token in enumerate(res[start + 2 : stop].split(','), 1):
+            out[count - 1] = float(token)
+
+    return err, count, res[stop + 2 :]
+
+
+class Param(NamedTuple):
+    """Values a command argument accepts, checked by the compiled encoder before anything is sent."""
+
+    kind: type | tuple = (int, float)
+    low: float | None = None
+    high: float | None = None
+    choices: tuple | None = None
+
+    def describe(self) -> str:
+        kinds = self.kind if isinstance(self.kind, tuple) else (self.kind,)
+        text = ' or '.join(kind.__name__ for kind in kinds)
+        if self.choices is not None:
+            return f'{text} in {self.choices}'
+        if self.low is not None and self.high is not None:
+            return f'{text} in {self.low}..{self.high}'
+        if self.low is not None:
+            return f'{text} >= {self.low}'
+        return f'{text} <= {self.high}' if self.high is not None else text
+
+
+RATIO = Param(int, 1, 100)
+PERCENT = Param(int, 0, 100)
+SWITCH = Param(int, choices=(0, 1))
+FRAME = Param(int, 0, 50)
+PORT = Param(int, 1)
+PARITY = Param(str, choices=('N', 'O', 'E'))
+REGISTER = Param(str, choices=('U16', 'U32', 'F32', 'F64'))
+JOG_AXES = tuple(
+    f'{axis}{sign}' for axis in ('J1', 'J2', 'J3', 'J4', 'J5', 'J6', 'X', 'Y', 'Z', 'Rx', 'Ry', 'Rz') for sign in '+-'
+)
+SERVO = {'t': Param(low=0.004, high=3600), 'aheadtime': Param(low=20, high=100), 'gain': Param(low=200, high=1000)}
+
+# optional arguments mean the same on every command that takes them
+PARAM_SCHEMA = {
+    '_user': FRAME,
+    '_tool': FRAME,
+    '_a': RATIO,
+    '_v': RATIO,
+    '_cp': PERCENT,
+    '_speed': Param(int, 1),
+    '_r': Param(low=0),
+}
+
+COMMAND_SCHEMA = {
+    'EnableRobot': {'load': Param(low=0), 'isCheck': SWITCH},
+    'BrakeControl': {'axisID': Param(int, 1, 6), 'value': SWITCH},
+    'SpeedFactor': {'ratio': RATIO},
+    'User': {'index': FRAME},
+    'SetUser': {'index': FRAME},
+    'Tool': {'index': FRAME},
+    'SetTool': {'index': FRAME},
+    'AccJ': {'R': RATIO},
+    'AccL': {'R': RATIO},
+    'VelJ': {'R': RATIO},
+    'VelL': {'R': RATIO},
+    'CP': {'R': PERCENT},
+    'SetCollisionLevel': {'level': Param(int, 0, 5)},
+    'SetPostCollisionMode': {'mode': SWITCH},
+    'EnableSafeSkin': {'status': SWITCH},
+    'SetSafeWallEnable': {'value': SWITCH},
+    'SetWorkZoneEnable': {'value': SWITCH},
+    'InverseKin': {'_useJointNear': SWITCH},
+    'GetTrayPoint': {'index': PORT},
+    'DO': {'index': PORT, 'status': SWITCH, 'time': Param(int, 25, 60000)},
+    'DOInstant': {'index': PORT, 'status': SWITCH},
+    'GetDO': {'index': PORT},
+    'ToolDO': {'index': Param(int, 1, 2), 'status': SWITCH},
+    'ToolDOInstant': {'index': Param(int, 1, 2), 'status': SWITCH},
+    'GetToolDO': {'index': Param(int, 1, 2)},
+    'DI': {'index': PORT},
+    'ToolDI': {'index': Param(int, 1, 2)},
+    'AI': {'index': Param(int, 1, 2)},
+    'ToolAI': {'index': Param(int, 1, 2)},
+    'SetTool485': {'parity': PARITY, 'stopbit': Param(int, choices=(1, 2))},
+    'SetToolPower': {'status': SWITCH},
+    'ModbusCreate': {'port': Param(int, 0, 65535), 'isRTU': SWITCH},
+    'ModbusRTUCreate': {'parity': PARITY, 'data_bit': Param(int, choices=(8,)), 'stop_bit': Param(int, choices=(1, 2))},
+    'GetInRegs': {'valType': REGISTER},
+    'GetHoldRegs': {'valType': REGISTER},
+    'setHoldRegs': {'valType': REGISTER},
+    'Circle': {'count': Param(int, 1)},
+    'RunTo': {'moveType': SWITCH},
+    'ServoJ': SERVO,
+    'ServoP': SERVO,
+    'MoveJog': {'axisID': Param(str, choices=JOG_AXES), '_coordType': Param(int, choices=(0, 1, 2))},
+    'StartPath': {'isConst': SWITCH},
+    'EnableFTSensor': {'status': SWITCH},
+    'GetForce': {'tool': FRAME},
+}
+
+
+def compile_check(arg: str, param: Param, idx: int, command: str, scope: dict) -> str:
+    # one `if` per argument, constants are bound into the encoder's globals
+    scope[f'kind_{idx}'] = param.kind
+    tests = [f'not isinstance({arg}, kind_{idx})']
+    # `bool` is an `int` subclass, but `True` is never meant as a ratio or a port
+    kinds = param.kind if isinstance(param.kind, tuple) else (param.kind,)
+    if int in kinds and bool not in kinds:
+        tests.append(f'isinstance({arg}, bool)')
+    if param.choices is not None:
+        scope[f'choices_{idx}'] = param.choices
+        tests.append(f'{arg} not in choices_{idx}')
+    if param.low is not None:
+        tests.append(f'{arg} < {param.low!r}')
+    if param.high is not None:
+        tests.append(f'{arg} > {param.high!r}')
+
+    message = f'{command}: `{arg.removeprefix("_")}` must be {param.describe()}, got '
+    return f'        if {" or ".join(tests)}:\n            raise ValueError({message!r} + repr({arg}))\n'
+
+
+def compile_command(func):
+    """Build an encoder with the signature of `func` (minus `self`) that returns its command string.
+
+    Arguments left as None are dropped and `_`-prefixed ones go out as `name=value`, the signature
+    is only inspected here, so a call costs no more than the generated function itself. Arguments
+    with an entry in `PARAM_SCHEMA` or `COMMAND_SCHEMA` raise `ValueError` before being encoded.
+    """
+    params = list(signature(func).parameters.values())[1:]
+    scope = {'format_arg': format_arg}
+    header, body = [], []
+
+    schema = COMMAND_SCHEMA.get(func.__name__, {})
+    unknown = schema.keys() - {param.name for param in params}
+    if unknown:
+        raise TypeError(f'Schema of `{func.__name__}` names unknown parameters {sorted(unknown)}.')
+
+    for idx, param in enumerate(params):
+        if param.kind not in (Parameter.POSITIONAL_OR_KEYWORD, Parameter.KEYWORD_ONLY):
+            raise TypeError(f'Unsupported parameter `{param}` in `{func.__name__}`.')
+        if param.kind == Parameter.KEYWORD_ONLY and '*' not in header:
+            header.append('*')
+
+        arg = param.name
+        if param.default is param.empty:
+            header.append(arg)
+        else:
+            scope[f'default_{idx}'] = param.default
+            header.append(f'{arg}=default_{idx}')
+
+        prefix = f'{arg.removeprefix("_")}=' if arg.startswith('_') else ''
+        param = schema.get(arg) or PARAM_SCHEMA.get(arg)
+        check = compile_check(arg, param, idx, func.__name__, scope) if param else ''
+        body.append(f'    if {arg} is not None:\n{check}        params.append({prefix!r} + format_arg({arg}))')
+
+    name = f'{func.__name__}('
+    source = '\n'.join(
+        [f'def encode({", ".join(header)}):', '    params = []', *body, f'    return {name!r} + ",".join(params) + ")"']
+    )
+    # the source is built only from the signature of a method defined in this module, never from input,
+    # and the builtin is named since main.py inlines this module next to an `exec()` of its own
+    builtins.exec(source, scope)  # noqa: S102
+
+    encode = scope['encode']
+    encode.__qualname__ = f'{func.__qualname__}.encode'
+    return encode
+
+
+class Vector6:
+    """Six doubles in an array, filled in place from a reply and formatted straight into a command argument."""
+
+    __slots__ = ('values',)
+
+    KIND = ''
+    FIELDS = ('v1', 'v2', 'v3', 'v4', 'v5', 'v6')
+
+    def __init__(self, values=None):
+        self.values = array('d', bytes(48) if values is None else values)
+        if len(self.values) != 6:
+            raise ValueError(f'{type(self).__name__} needs exactly 6 values.')
+
+    def __len__(self) -> int:
+        return 6
+
+    def __getitem__(self, idx):
+        return self.values[idx]
+
+    def __setitem__(self, idx, value) -> None:
+        self.values[idx] = value
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __eq__(self, other) -> bool:
+        try:
+            return len(other) == 6 and all(a == b for a, b in zip(self.values, other))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={value:g}' for name, value in zip(self.FIELDS, self.values))
+        return f'{type(self).__name__}({fields})'
+
+    @property
+    def braces(self) -> str:
+        return f'{{{",".join(map(format_arg, self.values))}}}'
+
+    def __str__(self) -> str:
+        # `joint={...}` / `pose={...}` as taken by the move commands
+        return f'{self.KIND}={self.braces}' if self.KIND else self.braces
+
+
+class Pose(Vector6):
+    __slots__ = ()
+
+    KIND = 'pose'
+    FIELDS = ('x', 'y', 'z', 'rx', 'ry', 'rz')
+
+    x = property(lambda self: self.values[0])
+    y = property(lambda self: self.values[1])
+    z = property(lambda self: self.values[2])
+    rx = property(lambda self: self.values[3])
+    ry = property(lambda self: self.values[4])
+    rz = property(lambda self: self.values[5])
+
+
+class JointVector(Vector6):
+    __slots__ = ()
+
+    KIND = 'joint'
+    FIELDS = ('j1', 'j2', 'j3', 'j4', 'j5', 'j6')
+
+    j1 = property(lambda self: self.values[0])
+    j2 = property(lambda self: self.values[1])
+    j3 = property(lambda self: self.values[2])
+    j4 = property(lambda self: self.values[3])
+    j5 = property(lambda self: self.values[4])
+    j6 = property(lambda self: self.values[5])
+
+
+class ForceVector(Vector6):
+    __slots__ = ()
+
+    FIELDS = ('fx', 'fy', 'fz', 'tx', 'ty', 'tz')
+
+    fx = property(lambda self: self.values[0])
+    fy = property(lambda self: self.values[1])
+    fz = property(lambda self: self.values[2])
+    tx = property(lambda self: self.values[3])
+    ty = property(lambda self: self.values[4])
+    tz = property(lambda self: self.values[5])
+
+
+class IOState:
+    """Levels of a group of IO ports, filled from `DIGroup`/`GetDOGroup` and formatted for `DOGroup`."""
+
+    __slots__ = ('indices', 'levels')
+
+    def __init__(self, indices, levels=None):
+        self.indices = array('H', indices)
+        self.levels = array('B', bytes(len(self.indices)) if levels is None else levels)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        return self.levels[idx]
+
+    def __setitem__(self, idx, value) -> None:
+        self.levels[idx] = int(value)
+
+    def __iter__(self):
+        return iter(self.levels)
+
+    def __eq__(self, other) -> bool:
+        try:
+            return len(other) == len(self.levels) and all(a == b for a, b in zip(self.levels, other))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'IOState({dict(zip(self.indices, self.levels))})'
+
+    def level(self, index: int) -> int:
+        return self.levels[self.indices.index(index)]
+
+    @property
+    def query(self) -> str:
+        # `index1,index2,...` as taken by `DIGroup`/`GetDOGroup`
+        return ','.join(map(str, self.indices))
+
+    def __str__(self) -> str:
+        # `index1,level1,index2,level2,...` as taken by `DOGroup`
+        return ','.join(f'{index},{level}' for index, level in zip(self.indices, self.levels))
+
+
+class RobotState(NamedTuple):
+    """Where the arm is and whether it is healthy, as of `stamp` (a `monotonic()` timestamp)."""
+
+    mode: int
+    pose: Pose
+    joints: JointVector
+    # GetErrorID groups, the controller's first and then one per joint
+    errors: tuple
+    stamp: float
+
+    @property
+    def healthy(self) -> bool:
+        return not any(self.errors)
+
+
+class Waypoint(NamedTuple):
+    """One point of `Dobot.run_path`, a joint or pose target, or with `relative` a tool frame offset."""
+
+    target: Vector6
+    linear: bool = False
+    relative: bool = False
+    v: int | None = None
+
+
+class Tray:
+    """Every slot pose of a 1D, 2D or 3D tray, from the corners and counts the `Create*DTray` commands take.
+
+    `counts` is (slots,), (rows, cols) or (rows, cols, layers). The corners are P1, P2 for a 1D tray,
+    for a 2D tray P1 the first slot, P2 the end of the first row, P3 the end and P4 the start of the last
+    row, and for a 3D tray P1-P4 on the bottom layer and P5-P8 above them on the top one. Slots are
+    interpolated like the controller does and numbered from 1, row by row, then layer by layer.
+    """
+
+    __slots__ = ('corners', 'counts', 'name', 'values')
+
+    # corners of a tray with one, two or three counts
+    CORNERS = (2, 4, 8)
+
+    def __init__(self, counts, corners, name='tray'):
+        self.name = name
+        self.counts = tuple(int(count) for count in counts)
+        self.corners = [corner if isinstance(corner, Vector6) else Pose(corner) for corner in corners]
+        dims = len(self.counts)
+        if not 1 <= dims <= len(self.CORNERS) or self.CORNERS[dims - 1] != len(self.corners) or min(self.counts) < 1:
+            raise ValueError(f'{len(self.corners)} corners and counts {self.counts} do not make a tray.')
+
+        # all slots at once, six doubles each
+        poses = isinstance(self.corners[0], Pose)
+        points = self.unwrapped() if poses else self.corners
+        self.values = array('d')
+        for weights in self.weights():
+            slot = [sum(weight * point[axis] for weight, point in zip(weights, points)) for axis in range(6)]
+            if poses:
+                slot[3:] = [(a + 180) % 360 - 180 for a in slot[3:]]
+            self.values.extend(slot)
+
+    def unwrapped(self) -> list:
+        # rx, ry, rz of every corner within 180 degrees of the first corner's, so corners at 179 and -179
+        # blend across the 180 degree seam instead of turning the tool around through 0
+
+        first = self.corners[0]
+        return [
+            [*corner[:3], *(a0 + (a - a0 + 180) % 360 - 180 for a0, a in zip(first[3:], corner[3:]))]
+            for corner in self.corners
+        ]
+
+    def weights(self):
+        # corner weights of every slot in order, linear along each count
+        def steps(count):
+            return [idx / (count - 1) if count > 1 else 0.0 for idx in range(count)]
+
+        if len(self.counts) == 1:
+            for u in steps(self.counts[0]):
+                yield 1 - u, u
+            return
+
+        rows, cols, layers = (*self.counts, 1)[:3]
+        for w in steps(layers):
+            for v in steps(rows):
+                for u in steps(cols):
+                    plane = ((1 - u) * (1 - v), u * (1 - v), u * v, (1 - u) * v)
+                    yield plane if len(self.counts) == 2 else (*(p * (1 - w) for p in plane), *(p * w for p in plane))
+
+    def __len__(self) -> int:
+        return len(self.values) // 6
+
+    def __getitem__(self, index: int) -> Vector6:
+        """Slot `index` counted from 1, as `GetTrayPoint` takes it."""
+        if not 1 <= index <= len(self):
+            raise IndexError(f'Slot {index} not in tray {self.name} of {len(self)}.')
+        return type(self.corners[0])(self.values[6 * (index - 1) : 6 * index])
+
+    def __iter__(self):
+        return (self[index] for index in range(1, len(self) + 1))
+
+    @property
+    def count(self) -> str:
+        return f'{{{",".join(map(str, self.counts))}}}'
+
+    @property
+    def points(self) -> str:
+        return f'{{{",".join(map(str, self.corners))}}}'
+
+    def approach(self, index: int, lift: float, v: int | None = None) -> list:
+        """Waypoints for `Dobot.run_path`, above slot `index` by `lift` mm in z, then straight down onto it."""
+        slot = self[index]
+        above = Pose(slot)
+        above[2] += lift
+        return [Waypoint(above, v=v), Waypoint(slot, linear=True, v=v)]
+
+
+class MotionHandle:
+    """Completion of one queued move, done once the controller has moved past its command ID.
+
+    `wait()` blocks and `await` polls from a coroutine, callbacks run on whichever call sees the move finish.
+    """
+
+    __slots__ = ('callbacks', 'cmd', 'command_id', 'dobot', 'done', 'error', 'finished', 'issued')
+
+    # modes in which a queued move never finishes by itself
+    ABORTED = (DobotRobotMode.POWER_OFF, DobotRobotMode.DISABLED, DobotRobotMode.ERROR)
+
+    def __init__(self, dobot: 'Dobot', cmd: str, command_id: int, error: int = DobotErrorCode.SUCCESS):
+        self.dobot = dobot
+        self.cmd = cmd
+        self.command_id = command_id
+        self.error = error
+        self.done = False
+        self.callbacks = []
+        # `monotonic()` stamps of the controller's answer and of the first check that saw the move done
+        self.issued = monotonic()
+        self.finished = None
+
+    def __repr__(self) -> str:
+        state = f'error {self.error}' if self.error else 'done' if self.done else 'pending'
+        return f'MotionHandle({self.command_id}, {state}, {self.cmd})'
+
+    @property
+    def elapsed(self) -> float | None:
+        """Seconds from queueing to completion, the run time of a move queued while the arm was idle."""
+        return None if self.finished is None else self.finished - self.issued
+
+    def add_done_callback(self, callback) -> None:
+        if self.done:
+            callback(self)
+        else:
+            self.callbacks.append(callback)
+
+    def check(self, current: int, mode: int) -> bool:
+        # a failed move is done as well, it raises on every check so no waiter misses the failure
+        if self.error:
+            self.finish()
+            raise RuntimeError(f'{self.cmd} failed with error {self.error}.')
+        if self.done:
+            return True
+
+        # the controller reports the move it is executing, and keeps reporting the last one once idle
+        if current > self.command_id or (current == self.command_id and mode != DobotRobotMode.RUNNING):
+            self.finished = monotonic()
+            self.finish()
+            return True
+
+        if mode in self.ABORTED:
+            self.error = DobotErrorCode.EXECUTION_FAILED
+            self.finish()
+            raise RuntimeError(f'{self.cmd} aborted in robot mode {mode}.')
+        return False
+
+    def finish(self) -> None:
+        if self.done:
+            return
+
+        self.done = True
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def wait(self, timeout: float | None = None, interval=0.02) -> 'MotionHandle':
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while not self.check(*self.dobot.progress()):
+            now = monotonic()
+            if deadline is not None and now >= deadline:
+                raise TimeoutError(f'{self.cmd} did not finish within {timeout}s.')
+
+            wake = now + interval if deadline is None else min(now + interval, deadline)
+            if self.dobot.streaming():
+                # returns as soon as the next feedback packet is in
+                self.dobot.reactor.poll(wake)
+            else:
+                sleep(wake - now)
+
+        return self
+
+    async def wait_async(self, timeout: float | None = None, interval=0.02) -> 'MotionHandle':
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            progress = self.dobot.progress()
+            if asyncio.iscoroutine(progress):
+                progress = await progress
+            if self.check(*progress):
+                return self
+
+            now = monotonic()
+            if deadline is not None and now >= deadline:
+                raise TimeoutError(f'{self.cmd} did not finish within {timeout}s.')
+            await asyncio.sleep(interval if deadline is None else min(interval, deadline - now))
+
+    def __await__(self):
+        return self.wait_async().__await__()
+
+
+class ShadowState:
+    """Last acknowledged setter commands and recent query results, kept to skip redundant round trips.
+
+    A setter repeating its acknowledged value is not sent again and a query is answered from cache
+    for `ttl` seconds, with a copy so callers may modify what they get. Motion drops the pose queries,
+    IO writes the IO reads, frame and payload setters the kinematics, and state changes or any error
+    reply drop everything.
+    """
+
+    SETTERS = frozenset(
+        ('SetPayload', 'User', 'Tool', 'SpeedFactor', 'AccJ', 'AccL', 'VelJ', 'VelL', 'CP', 'SetParallelGripper')
+    )
+    MOTION_QUERIES = frozenset(('GetPose', 'GetAngle', 'GetForce'))
+    IO_QUERIES = frozenset(('GetDO', 'GetDOGroup', 'GetToolDO', 'GetAO'))
+    KINEMATICS_QUERIES = frozenset(('PositiveKin', 'InverseKin'))
+    QUERIES = MOTION_QUERIES | IO_QUERIES | KINEMATICS_QUERIES | {'DI', 'DIGroup', 'ToolDI', 'AI', 'ToolAI'}
+
+    IO_COMMANDS = frozenset(('DO', 'DOInstant', 'DOGroup', 'ToolDO', 'ToolDOInstant', 'AO', 'AOInstant'))
+    FRAME_COMMANDS = frozenset(('User', 'Tool', 'SetUser', 'SetTool', 'SetPayload'))
+    STATE_COMMANDS = frozenset(
+        (
+            'PowerON',
+            'EnableRobot',
+            'DisableRobot',
+            'ClearError',
+            'EmergencyStop',
+            'Stop',
+            'Pause',
+            'Continue',
+            'RunScript',
+            'StartDrag',
+            'StopDrag',
+            'BrakeControl',
+        )
+    )
+
+    def __init__(self, ttl=0.1):
+        self.ttl = ttl
+        self.enabled = True
+        self.setters = {}
+        # cmd -> (name, stamp, result)
+        self.queries = {}
+        self.lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.setters.clear()
+            self.queries.clear()
+
+    def drop(self, names) -> None:
+        with self.lock:
+            for cmd in [cmd for cmd, (name, *_) in self.queries.items() if name in names]:
+                del self.queries[cmd]
+
+    def lookup(self, name: str, cmd: str):
+        # returns (hit, result)
+        if not self.enabled:
+            return False, None
+        if name in self.SETTERS:
+            return self.setters.get(name) == cmd, []
+
+        entry = self.queries.get(cmd)
+        if entry is not None and monotonic() - entry[1] < self.ttl:
+            return True, deepcopy(entry[2])
+        return False, None
+
+    def issue(self, name: str, channel: str) -> None:
+        if channel == DobotChannel.MOTION:
+            self.drop(self.MOTION_QUERIES)
+        elif name in self.IO_COMMANDS:
+            self.drop(self.IO_QUERIES)
+        elif name in self.FRAME_COMMANDS:
+            self.drop(self.KINEMATICS_QUERIES | self.MOTION_QUERIES)
+        elif name in self.STATE_COMMANDS:
+            self.clear()
+
+    def store(self, cmd: str, err: int, result) -> None:
+        name = cmd.split('(', 1)[0]
+        if err != DobotErrorCode.SUCCESS:
+            self.clear()
+        elif name in self.SETTERS:
+            with self.lock:
+                self.setters[name] = cmd
+        elif name in self.QUERIES and self.ttl > 0:
+            with self.lock:
+                self.queries[cmd] = (name, monotonic(), deepcopy(result))
+
+
 class Dobot:
-    def __init__(self, address, isSerial: bool = False, name='Dobot', handle=print):
+    def __init__(self, address, isSerial: bool = False, name='Dobot', handle=print, ports=None, reactor=None):
         self.address = address
         self.name = name
-        self.conn = SerialConn(name) if isSerial else SocketConn()
         self.handle = handle
         self.isDebug = False
+        self.autoReconnect = True
+        self.resumable = False
+        self.session = {}
+        self.shadow = ShadowState()
+        self.motions = []
+        # per address, replies still owed to callers that gave up waiting for them
+        self.abandoned = {}
+        self.local = threading.local()
+
+        # e.g. ports={DobotChannel.MOTION: 30003, DobotChannel.FEEDBACK: 30004},
+        # channels without a port of their own share the dashboard connection
+        self.addresses = {DobotChannel.DASHBOARD: address}
+        if ports and not isSerial:
+            self.addresses |= {channel: (address[0], port) for channel, port in ports.items()}
+
+        # one connection and one lock per distinct address, all read through a single reactor
+        self.reactor = reactor or IOReactor()
+        self.pool = {}
+        for addr in self.addresses.values():
+            if addr not in self.pool:
+                conn = SerialConn(name, reactor=self.reactor) if isSerial else SocketConn(reactor=self.reactor)
+                self.pool[addr] = (conn, threading.RLock())
+
+        self.conn = self.pool[address][0]
+
+        feedback = self.addresses.get(DobotChannel.FEEDBACK)
+        self.feedback = DobotFeedback(self.pool[feedback][0], handle=handle) if feedback else None
+
+    @property
+    def pending(self):
+        return getattr(self.local, 'pending', None)
+
+    @pending.setter
+    def pending(self, value):
+        self.local.pending = value
 
     # core functions used to communicate with Dobot
     # region core
@@ -155,11 +1577,10 @@ class Dobot:
                 self.error('Execution failed.')
             case DobotErrorCode.ALARMED:
                 self.error('Robot is in alarmed state.')
-                self.ClearError()
-                time.sleep(1)
+                self.recover(err)
             case DobotErrorCode.EMERGENCY_STOP:
                 self.error('Emergency stop activated, disconnect')
-                self.disconnect()
+                self.recover(err)
             case DobotErrorCode.POWER_OFF:
                 self.error('Power is off.')
             case DobotErrorCode.SCRIPT_RUNNING:
@@ -179,58 +1600,387 @@ class Dobot:
 
         return params
 
-    def parse(self, res: str, cmd: str, resolver=None):
-        func_name, _ = cmd.split('(', 1)
-        err, params_ = res.split(',{', 1)
-        params, _ = params_.split('},' + func_name, 1)
+    def resolve_motion(self, err: int, params: list, cmd: str):
+        params = self.resolve(err, params, cmd)
+        if err != DobotErrorCode.SUCCESS:
+            return MotionHandle(self, cmd, -1, err)
+        # jogging and servo commands are not queued and carry no command ID
+        if not params:
+            return params
 
-        err = int(err)
-        # params = params[1:-1]
-        params = [float(p) if '.' in p else int(p) for p in params.split(',')] if params else []
-        cmd = func_name + _
+        handle = MotionHandle(self, cmd, int(params[0]))
+        self.motions = [motion for motion in self.motions if not motion.done]
+        self.motions.append(handle)
+        return handle
+
+    def streaming(self) -> bool:
+        return bool(self.feedback and self.feedback.conn.status and self.feedback.count)
+
+    def progress(self) -> tuple[int, int]:
+        """Command ID being executed and the robot mode, from the feedback stream when live."""
+        if self.streaming():
+            state = self.feedback.latest()
+            return state.current_command_id, int(state.robot_mode)
+
+        with self.pipeline() as results:
+            self.GetCurrentCommandID()
+            self.RobotMode()
+
+        current, mode = results
+        if not (current and mode):
+            raise ConnectionError('No motion progress from Dobot.')
+        return current[0], mode[0]
+
+    def update(self) -> None:
+        """Retire finished moves and run their callbacks, cheap enough to call every frame.
+
+        Failed moves are retired too, the first failure is raised once every handle is checked.
+        """
+        self.motions = [handle for handle in self.motions if not handle.done]
+        if self.motions:
+            self.retire(self.progress())
+
+    def retire(self, progress: tuple[int, int]) -> None:
+        failures = []
+        for handle in self.motions:
+            try:
+                handle.check(*progress)
+            except RuntimeError as e:
+                failures.append(e)
+
+        self.motions = [handle for handle in self.motions if not handle.done]
+        if failures:
+            raise failures[0]
+
+    def recover(self, err: int) -> None:
+        if err == DobotErrorCode.ALARMED:
+            self.ClearError()
+            sleep(1)
+        elif err == DobotErrorCode.EMERGENCY_STOP:
+            # `disconnect` leaves the client not resumable, the arm is only enabled again
+            # by an explicit `connect()` or `reconnect()` once the stop is released
+            self.disconnect()
 
-        return resolver(err, params, cmd) if resolver else self.resolve(err, params, cmd)
+    # settings replayed after a reconnect, in this order
+    SESSION = (
+        'EnableRobot',
+        'SetPayload',
+        'User',
+        'Tool',
+        'SpeedFactor',
+        'AccJ',
+        'AccL',
+        'VelJ',
+        'VelL',
+        'CP',
+        'SetParallelGripper',
+    )
+
+    def track(self, err: int, cmd: str) -> None:
+        if err != DobotErrorCode.SUCCESS:
+            return
 
-    def send_cmd(self, cmd: str, handler=None):
-        if not (self.conn and self.conn.status):
+        name = cmd.split('(', 1)[0]
+        if name in self.SESSION:
+            self.session[name] = cmd
+        elif name == 'DisableRobot':
+            self.session.pop('EnableRobot', None)
+
+    def reconnect(self, addr=None, attempts=5, backoff=0.05) -> bool:
+        """Reopen the connection to `addr`, or every one, with exponential backoff, then replay the session state.
+
+        Only the given channel is touched, moves tracked over the motion channel survive a dashboard drop.
+        The session is replayed whenever the dashboard connection was reopened.
+        """
+        for attempt in range(attempts):
+            if addr is not None:
+                if self.reopen(addr):
+                    break
+            else:
+                for conn, _ in self.pool.values():
+                    conn.disconnect()
+                if self.connect():
+                    break
+
+            sleep(backoff * 2**attempt)
+
+        else:
+            return False
+
+        if addr not in (None, self.address):
+            return True
+
+        session = [self.session[name] for name in self.SESSION if name in self.session]
+        self.info(f'Replaying {len(session)} session commands.')
+
+        # commands pipelined on the dropped connection will never be answered
+        pending, self.pending = self.pending, None
+        try:
+            with self.pipeline():
+                self.ClearError()
+                for cmd in session:
+                    self.send_cmd(cmd)
+        finally:
+            self.pending = pending
+
+        return True
+
+    def reopen(self, addr) -> bool:
+        conn = self.pool[addr][0]
+        conn.disconnect()
+
+        try:
+            self.info(f'Connecting to {addr}')
+            conn.connect(addr)
+        except OSError as e:
+            self.error(f'Connection failed: {e}')
+            conn.disconnect()
+            return False
+
+        if self.feedback and self.feedback.conn is conn:
+            self.feedback.start()
+
+        # as after `connect()`, nothing is owed on the fresh link and the shadow may be stale
+        self.abandoned.pop(addr, None)
+        self.shadow.clear()
+        return True
+
+    def revive(self, addr=None) -> bool:
+        return self.autoReconnect and self.resumable and self.reconnect(addr)
+
+    def parse(self, res: str, cmd: str, resolver=None, out=None):
+        if out is None:
+            err, params, echo = parse_reply(res)
+        else:
+            err, _, echo = parse_reply_into(res, out)
+            # a rejected query leaves `out` unfilled, never hand that out as a reading
+            params = out if err == DobotErrorCode.SUCCESS else []
+
+        self.track(err, cmd)
+        result = resolver(err, params, echo) if resolver else self.resolve(err, params, echo)
+
+        self.shadow.store(cmd, err, result)
+        return result
+
+    def route(self, channel: str):
+        return self.addresses.get(channel, self.address)
+
+    @contextmanager
+    def deadline(self, timeout: float | None):
+        """Bound every reply awaited in the block by one shared time budget in seconds."""
+        outer = getattr(self.local, 'deadline', None)
+        if timeout is not None:
+            inner = monotonic() + timeout
+            self.local.deadline = inner if outer is None else min(outer, inner)
+
+        try:
+            yield
+
+        finally:
+            self.local.deadline = outer
+
+    def budget(self) -> float | None:
+        deadline = getattr(self.local, 'deadline', None)
+        return None if deadline is None else max(deadline - monotonic(), 0)
+
+    def send_cmd(self, cmd: str, handler=None, channel=DobotChannel.DASHBOARD, timeout: float | None = None, out=None):
+        addr = self.route(channel)
+        conn, lock = self.pool[addr]
+
+        if not (self.conn and conn.status) and not self.revive(addr):
             self.error('Not connected to Dobot.')
             raise ConnectionError('Not connected to Dobot.')
 
-        self.conn.send(cmd)
+        hit, result = self.shortcut(cmd, handler, channel, out)
+        if hit:
+            return result
+        # a type as `out` only asks for a fresh result object, which the shadow state may share
+        if isinstance(out, type):
+            out = out()
+
+        # inside `pipeline()` commands are sent in one batch per channel when the block exits,
+        # the channel lock stays held until the replies are in so nothing interleaves with them
+        if self.pending is not None:
+            if all(held != addr for *_, held in self.pending):
+                lock.acquire()
+            self.pending.append((cmd, handler, out, addr))
+            return None
+
+        try:
+            res, bounded = self.exchange(addr, cmd, timeout)
 
-        res = self.conn.recv()
+        except OSError as e:
+            self.error(f'Connection lost: {e}')
+            conn.disconnect()
 
+            # a move may already be running, only queries and settings are sent again
+            if channel == DobotChannel.MOTION or not self.revive(addr):
+                raise ConnectionError(f'Connection lost while sending `{cmd}`.') from e
+            res, bounded = self.exchange(addr, cmd, timeout)
+
+        if not res and bounded:
+            self.error(f'No response for `{cmd}` before the deadline.')
+            raise TimeoutError(f'No response for `{cmd}` before the deadline.')
+
+        return self.reply(res, cmd, handler, out)
+
+    def shortcut(self, cmd: str, handler, channel: str, out):
+        # answer from the shadow state when possible, otherwise drop what the command may change
+        name = cmd.split('(', 1)[0]
+        if self.pending is None and handler is None and (out is None or isinstance(out, type)):
+            hit, result = self.shadow.lookup(name, cmd)
+            if hit:
+                self.debug(f'Shadowed `{cmd}`')
+                return True, result
+
+        self.shadow.issue(name, channel)
+        return False, None
+
+    def exchange(self, addr, cmd: str, timeout: float | None):
+        conn, lock = self.pool[addr]
+
+        with lock, self.deadline(timeout):
+            conn.send(cmd)
+            res = conn.recv(self.budget())
+            while self.stale(addr, res):
+                res = conn.recv(self.budget())
+
+            if not (res or conn.status):
+                raise ConnectionResetError('Connection closed by peer.')
+            if not res:
+                self.abandon(addr)
+
+            return res, self.budget() is not None
+
+    def stale(self, addr, res: str) -> bool:
+        # replies arrive in order, so exactly as many as were abandoned on a connection come before the next
+        # caller's, skipping by name would hand a late reply to the next command of the same name
+        if not (res and self.abandoned.get(addr)):
+            return False
+
+        self.abandoned[addr] -= 1
+        self.warning(f'Discard stale response: {res}')
+        return True
+
+    def abandon(self, addr, count=1) -> None:
+        self.abandoned[addr] = self.abandoned.get(addr, 0) + count
+
+    @staticmethod
+    def echo(res: str) -> str:
+        # replies look like `ErrorID,{values},Cmd(args);`, the name follows the last `},` before the args,
+        # which may hold braces of their own as in `MovJ(joint={...},cp=50)`
+        head = res.split('(', 1)[0]
+        idx = head.rfind('},')
+        return head[idx + 2 :] if idx >= 0 else ''
+
+    @contextmanager
+    def pipeline(self):
+        """Send every command issued in the block back to back, collect replies on exit."""
+        if self.pending is not None:
+            raise RuntimeError('Pipeline already active.')
+
+        results = []
+        self.pending = []
+
+        try:
+            yield results
+
+        except BaseException:
+            # nothing of a failed block is sent, the channel locks taken for it are handed back
+            pending, self.pending = self.pending, None
+            for addr in dict.fromkeys(addr for *_, addr in pending):
+                self.pool[addr][1].release()
+            raise
+
+        pending, self.pending = self.pending, None
+        results.extend(self.collect(pending))
+
+    def collect(self, pending: list) -> list:
+        # read every reply before resolving any, resolvers may send commands themselves
+        replies = []
+        missing = 0
+        for addr in dict.fromkeys(addr for *_, addr in pending):
+            conn, lock = self.pool[addr]
+            cmds = [cmd for cmd, *_, held in pending if held == addr]
+
+            try:
+                try:
+                    conn.send_many(cmds)
+                except OSError as e:
+                    self.error(f'Connection lost: {e}')
+                    conn.disconnect()
+
+                received = 0
+                while received < len(cmds):
+                    res = conn.recv(self.budget()) if conn.status else ''
+                    if not res:
+                        break
+                    if not self.stale(addr, res):
+                        replies.append(res)
+                        received += 1
+
+                # replies still on their way are skipped by whoever uses the connection next
+                if conn.status and received < len(cmds):
+                    self.abandon(addr, len(cmds) - received)
+                    missing += len(cmds) - received
+            finally:
+                lock.release()
+
+        results = self.match(pending, replies)
+        if missing and self.budget() is not None:
+            self.error(f'{missing} pipelined responses missing at the deadline.')
+            raise TimeoutError(f'{missing} pipelined responses missing at the deadline.')
+        return results
+
+    def match(self, pending: list, replies: list) -> list:
+        results = [[] for _ in pending]
+        waiting = [cmd.split('(', 1)[0] for cmd, *_ in pending]
+
+        for res in replies:
+            name = self.echo(res)
+            if name not in waiting:
+                self.error(f'Unmatched pipelined response: {res}')
+                continue
+
+            idx = waiting.index(name)
+            waiting[idx] = None
+            cmd, handler, out, _ = pending[idx]
+            results[idx] = self.reply(res, cmd, handler, out)
+
+        for idx, name in enumerate(waiting):
+            if name is not None:
+                self.error(f'No response for pipelined `{pending[idx][0]}`')
+
+        return results
+
+    def reply(self, res: str, cmd: str, handler=None, out=None):
         if res == 'Control Mode Is Not Tcp':
             self.disconnect()
             raise ConnectionError('Control mode is online mode instead of tcp mode, disconnect')
 
         try:
             assert res.endswith(';'), 'Invalid response format from Dobot.'
-            return self.parse(res.removesuffix(';'), cmd, handler)
+            return self.parse(res.removesuffix(';'), cmd, handler, out)
 
         except Exception as e:
             self.error(f'Error parsing response: {e}')
             return []
 
     @staticmethod
-    def send(resolver=None):
+    def send(resolver=None, channel=DobotChannel.DASHBOARD, result=None):
+        # `result` is a type the reply values are parsed into, unless the caller passes its own `out`
         def decorator(func):
-            @wraps(func)
-            def sender(self: 'Dobot', *args, **kwargs):
-                sign = signature(func)
-                func_name = func.__name__
+            encode = compile_command(func)
 
-                bound = sign.bind(self, *args, **kwargs)
-                bound.apply_defaults()
-                params = [
-                    f'{k.removeprefix("_")}={v}' if k.startswith('_') else str(v)
-                    for k, v in bound.arguments.items()
-                    if k != 'self' and v is not None
-                ]
-                cmd = f'{func_name}({",".join(params)})'
+            # moves resolve into a `MotionHandle` unless the method brings its own resolver
+            motion = resolver is None and channel == DobotChannel.MOTION
 
-                return self.send_cmd(cmd, resolver)
+            @wraps(func)
+            def sender(self: 'Dobot', *args, out=None, **kwargs):
+                handler = self.resolve_motion if motion else resolver
+                return self.send_cmd(encode(*args, **kwargs), handler, channel, out=result if out is None else out)
 
+            sender.encode = encode
             return sender
 
         return decorator
@@ -252,32 +2002,81 @@ class Dobot:
         supply = f'{supply or self.name}'
         self.handle(f'-- [E] [{supply:^18}] {msg}')
 
-    def connect(self) -> None:
+    def connect(self) -> bool:
         if not self.conn:
             raise ConnectionError('Conn is not prepared!')
 
         try:
-            self.info(f'Connecting to {self.address}')
-            self.conn.connect(self.address)
+            for addr, (conn, _) in self.pool.items():
+                self.info(f'Connecting to {addr}')
+                conn.connect(addr)
             self.info('Connection established.')
 
+            if self.feedback:
+                self.feedback.start()
+
         except Exception as e:
             self.error(f'Connection failed: {e}')
-            self.conn = None
+            for conn, _ in self.pool.values():
+                conn.disconnect()
+            return False
+
+        # whatever was shadowed may have changed while the link was down, fresh links owe no replies
+        self.shadow.clear()
+        self.abandoned.clear()
+        self.resumable = True
+        return True
 
     def disconnect(self) -> None:
+        self.resumable = False
+
         if not (self.conn and self.conn.status):
             self.debug('No active connection to disconnect.')
             return
 
         self.info('Disconnecting...')
-        self.conn.disconnect()
-        self.conn = None
+        for conn, _ in self.pool.values():
+            conn.disconnect()
         self.info('Disconnected.')
 
     def enable_debug(self) -> None:
         self.isDebug = True
 
+    def capture(self, prefix) -> None:
+        """Record the raw traffic of every connection to `<prefix>.<channel>.cap` until `stop_capture()`."""
+        for channel, addr in self.addresses.items():
+            conn = self.pool[addr][0]
+            if not conn.capture:
+                conn.capture = WireCapture(f'{prefix}.{channel}.cap')
+
+    def stop_capture(self) -> None:
+        for conn, _ in self.pool.values():
+            # detached before closing, so no read lands on a closed file
+            capture, conn.capture = getattr(conn, 'capture', None), None
+            if capture:
+                capture.close()
+
+    @contextmanager
+    def capturing(self, prefix):
+        """Record the traffic of the block like `capture`, the logs are complete once it exits."""
+        self.capture(prefix)
+        try:
+            yield
+
+        finally:
+            self.stop_capture()
+
+    def replay(self, prefix, speed: float | None = None) -> None:
+        """Swap every connection for a `ReplayConn` over the logs written by `capture`."""
+        for channel, addr in self.addresses.items():
+            conn, lock = self.pool[addr]
+            if not isinstance(conn, ReplayConn):
+                self.pool[addr] = (ReplayConn(f'{prefix}.{channel}.cap', speed=speed), lock)
+
+        self.conn = self.pool[self.address][0]
+        if self.feedback:
+            self.feedback.conn = self.pool[self.addresses[DobotChannel.FEEDBACK]][0]
+
     # endregion
     # --------------
     # region control
@@ -439,13 +2238,13 @@ class Dobot:
     def RobotMode(self):
         pass
 
-    @send()
+    @send(result=Pose)
     def PositiveKin(
         self, J1: float, J2: float, J3: float, J4: float, J5: float, J6: float, _user: int = 0, _tool: int = 0
     ):
         pass
 
-    @send()
+    @send(result=JointVector)
     def InverseKin(
         self,
         X: float,
@@ -461,11 +2260,11 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(result=JointVector)
     def GetAngle(self):
         pass
 
-    @send()
+    @send(result=Pose)
     def GetPose(self, _user: int = 0, _tool: int = 0):
         pass
 
@@ -653,7 +2452,7 @@ class Dobot:
     # ---------------
     # region movement
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def MovJ(
         self,
         P: str,
@@ -665,7 +2464,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def MovL(
         self,
         P: str,
@@ -679,7 +2478,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def MovLIO(
         self,
         P: str,
@@ -694,7 +2493,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def MovJIO(
         self,
         P: str,
@@ -707,7 +2506,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def Arc(
         self,
         P1: str,
@@ -723,7 +2522,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def Circle(
         self,
         P1: str,
@@ -739,7 +2538,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def ServoJ(
         self,
         J1: float,
@@ -754,7 +2553,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def ServoP(
         self,
         X: float,
@@ -769,11 +2568,11 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def MoveJog(self, axisID: str | None = None, _coordType: int = 0, _user: int = 0, _tool: int = 0):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def RunTo(
         self,
         P: str,
@@ -785,11 +2584,11 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(result=Pose)
     def GetStartPose(self, traceName: str):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def StartPath(
         self,
         traceName: str,
@@ -802,7 +2601,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def RelMovJTool(
         self,
         offsetX: float,
@@ -819,7 +2618,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def RelMovLTool(
         self,
         offsetX: float,
@@ -838,7 +2637,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def RelMovJUser(
         self,
         offsetX: float,
@@ -855,7 +2654,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def RelMovLUser(
         self,
         offsetX: float,
@@ -874,7 +2673,7 @@ class Dobot:
     ):
         pass
 
-    @send()
+    @send(channel=DobotChannel.MOTION)
     def RelJointMovJ(
         self,
         offset1: float,
@@ -951,7 +2750,7 @@ class Dobot:
     def SixForceHome(self):
         pass
 
-    @send()
+    @send(result=ForceVector)
     def GetForce(self, tool: int = 0):
         pass
 
@@ -1017,7 +2816,7 @@ class Dobot:
         cp: int | None = None,
     ):
         assert len(jointList) == 6, 'jointList must contain exactly 6 elements.'
-        return self.MovJ(f'joint={{{",".join(map(str, jointList))}}}', user, tool, a, v, cp)
+        return self.MovJ(str(JointVector(jointList)), user, tool, a, v, cp)
 
     def MovJPose(
         self,
@@ -1029,7 +2828,7 @@ class Dobot:
         cp: int | None = None,
     ):
         assert len(poseList) == 6, 'poseList must contain exactly 6 elements.'
-        return self.MovJ(f'pose={{{",".join(map(str, poseList))}}}', user, tool, a, v, cp)
+        return self.MovJ(str(Pose(poseList)), user, tool, a, v, cp)
 
     def MovLJoint(
         self,
@@ -1043,7 +2842,7 @@ class Dobot:
         r: str | None = None,
     ):
         assert len(jointList) == 6, 'jointList must contain exactly 6 elements.'
-        return self.MovL(f'joint={{{",".join(map(str, jointList))}}}', user, tool, a, v, speed, cp, r)
+        return self.MovL(str(JointVector(jointList)), user, tool, a, v, speed, cp, r)
 
     def MovLPose(
         self,
@@ -1057,7 +2856,7 @@ class Dobot:
         r: str | None = None,
     ):
         assert len(poseList) == 6, 'poseList must contain exactly 6 elements.'
-        return self.MovL(f'pose={{{",".join(map(str, poseList))}}}', user, tool, a, v, speed, cp, r)
+        return self.MovL(str(Pose(poseList)), user, tool, a, v, speed, cp, r)
 
     def RelPointUserJoint(
         self,
@@ -1066,7 +2865,7 @@ class Dobot:
     ):
         assert len(jointList) == 6, 'jointList must contain exactly 6 elements.'
         assert len(offsetList) == 6, 'offsetList must contain exactly 6 elements.'
-        return self.RelPointUser(f'joint={{{",".join(map(str, jointList))}}}', f'{{{",".join(map(str, offsetList))}}}')
+        return self.RelPointUser(str(JointVector(jointList)), Vector6(offsetList).braces)
 
     def RelPointUserPose(
         self,
@@ -1075,7 +2874,94 @@ class Dobot:
     ):
         assert len(poseList) == 6, 'poseList must contain exactly 6 elements.'
         assert len(offsetList) == 6, 'offsetList must contain exactly 6 elements.'
-        return self.RelPointUser(f'pose={{{",".join(map(str, poseList))}}}', f'{{{",".join(map(str, offsetList))}}}')
+        return self.RelPointUser(str(Pose(poseList)), Vector6(offsetList).braces)
+
+    def snapshot(self) -> RobotState:
+        """Read pose, joints, mode and errors in one pipelined round trip, from the feedback stream when live."""
+        state = self.feedback.latest() if self.feedback and self.feedback.conn.status else None
+
+        if state is not None and not state.error_status:
+            return RobotState(int(state.robot_mode), Pose(state.pose), JointVector(state.joints), (), monotonic())
+
+        failed = []
+        with self.pipeline() as results:
+            for query in self.state_queries(state is None, failed):
+                query()
+
+        return self.build_state(state, results, failed)
+
+    def state_queries(self, full: bool, failed: list) -> list:
+        # queries behind `snapshot`, the command of every rejected reply is collected in `failed`
+        def check(err: int, params: list, cmd: str):
+            if err != DobotErrorCode.SUCCESS:
+                failed.append(cmd)
+            return self.resolve(err, params, cmd)
+
+        queries = [(self.GetPose, Pose), (self.GetAngle, JointVector), (self.RobotMode, None)] if full else []
+        queries.append((self.GetErrorID, None))
+        return [partial(self.send_cmd, sender.encode(), check, out=out) for sender, out in queries]
+
+    def build_state(self, state, results: list, failed: list) -> RobotState:
+        if failed or not all(results):
+            raise ConnectionError(f'Incomplete state snapshot from Dobot, rejected: {failed or "none"}.')
+
+        errors = tuple(tuple(group) for group in results[-1][0])
+        if state is not None:
+            return RobotState(int(state.robot_mode), Pose(state.pose), JointVector(state.joints), errors, monotonic())
+
+        pose, joints, mode, _ = results
+        return RobotState(mode[0], pose, joints, errors, monotonic())
+
+    def plan_path(self, waypoints, blend=50, radius=None, v=None, a=None) -> list:
+        # every move is encoded here first, a bad waypoint raises before anything of the path is queued
+        points = [point if isinstance(point, Waypoint) else Waypoint(JointVector(point)) for point in waypoints]
+
+        steps = []
+        for idx, point in enumerate(points):
+            if point.relative:
+                move, args = (self.RelMovLTool if point.linear else self.RelMovJTool), tuple(point.target)
+            else:
+                move, args = (self.MovL if point.linear else self.MovJ), (str(point.target),)
+
+            # the arm stops exactly on the last point, `cp` and `r` exclude each other
+            kwargs = {'_a': a, '_v': point.v if point.v is not None else v}
+            if idx == len(points) - 1:
+                kwargs['_cp'] = 0
+            elif point.linear and radius is not None:
+                kwargs['_r'] = radius
+            else:
+                kwargs['_cp'] = blend
+
+            move.encode(*args, **kwargs)
+            steps.append((move, args, kwargs))
+
+        return steps
+
+    def run_path(self, waypoints, blend=50, radius=None, v=None, a=None) -> list:
+        """Queue the waypoints in one round trip, the arm blends through every point but the last.
+
+        Plain lists are joint targets for `MovJ`. `blend` is the continuous path ratio in percent,
+        `radius` blends linear moves over a fixed distance in mm instead. Returns the motion handles,
+        the last one completes with the whole path.
+        """
+        with self.pipeline() as handles:
+            for move, args, kwargs in self.plan_path(waypoints, blend, radius, v, a):
+                move(*args, **kwargs)
+
+        return handles
+
+    def CreateTray(self, tray: Tray):
+        """Register `tray` on the controller, only needed for `GetTrayPoint` or scripts running there."""
+        create = (self.Create1DTray, self.Create2DTray, self.Create3DTray)[len(tray.counts) - 1]
+        return create(tray.name, tray.count, tray.points)
+
+    def ReadDI(self, *indices: int) -> IOState | list:
+        state = IOState(indices)
+        return self.DIGroup(state.query, out=state)
+
+    def ReadDO(self, *indices: int) -> IOState | list:
+        state = IOState(indices)
+        return self.GetDOGroup(state.query, out=state)
 
     def Home(self):
         return self.MovJJoint([0, 0, 0, 0, 0, 0])
@@ -1089,6 +2975,189 @@ class Dobot:
     # endregion
 
 
+class AsyncDobot(Dobot):
+    """Dobot on asyncio streams, every command method returns a coroutine."""
+
+    def __init__(self, address, isSerial: bool = False, name='Dobot', handle=print):
+        super().__init__(address, isSerial, name, handle)
+        self.conn = AsyncSerialConn(name, handle) if isSerial else AsyncSocketConn()
+        self.lock = asyncio.Lock()
+        self.recovering = None
+        # every coroutine runs on the loop's thread, the open pipeline belongs to the task that opened it
+        self.piped = ContextVar(f'{name}.pending', default=None)
+
+    @property
+    def pending(self):
+        return self.piped.get()
+
+    @pending.setter
+    def pending(self, value):
+        self.piped.set(value)
+
+    def recover(self, err: int) -> None:
+        # resolve runs synchronously, the actual recovery is awaited by `settle`
+        self.recovering = err
+
+    async def settle(self) -> None:
+        err, self.recovering = self.recovering, None
+
+        if err == DobotErrorCode.ALARMED:
+            await self.ClearError()
+            await asyncio.sleep(1)
+        elif err == DobotErrorCode.EMERGENCY_STOP:
+            await self.disconnect()
+
+    async def send_cmd(
+        self, cmd: str, handler=None, channel=DobotChannel.DASHBOARD, timeout: float | None = None, out=None
+    ):
+        # a single stream carries every channel here, awaiting already keeps queries from blocking motion
+        if not (self.conn and self.conn.status):
+            self.error('Not connected to Dobot.')
+            raise ConnectionError('Not connected to Dobot.')
+
+        hit, result = self.shortcut(cmd, handler, channel, out)
+        if hit:
+            return result
+        # a type as `out` only asks for a fresh result object, which the shadow state may share
+        if isinstance(out, type):
+            out = out()
+
+        if self.pending is not None:
+            self.pending.append((cmd, handler, out, self.address))
+            return None
+
+        async with self.lock:
+            await self.conn.send(cmd)
+
+            try:
+                async with asyncio.timeout(timeout):
+                    res = await self.conn.recv()
+                    while self.stale(self.address, res):
+                        res = await self.conn.recv()
+
+            except (TimeoutError, asyncio.CancelledError):
+                self.abandon(self.address)
+                raise
+
+        if res == 'Control Mode Is Not Tcp':
+            await self.disconnect()
+            raise ConnectionError('Control mode is online mode instead of tcp mode, disconnect')
+
+        result = self.reply(res, cmd, handler, out)
+        await self.settle()
+        return result
+
+    @asynccontextmanager
+    async def pipeline(self):
+        """Send every command awaited in the block back to back, collect replies on exit."""
+        if self.pending is not None:
+            raise RuntimeError('Pipeline already active.')
+
+        results = []
+        await self.lock.acquire()
+        self.pending = []
+
+        try:
+            yield results
+
+        except BaseException:
+            # nothing of a failed block is sent
+            self.pending = None
+            self.lock.release()
+            raise
+
+        pending, self.pending = self.pending, None
+
+        try:
+            replies = []
+            if self.conn and pending:
+                await self.conn.send_many([cmd for cmd, *_ in pending])
+
+            while len(replies) < len(pending):
+                res = await self.conn.recv() if self.conn else ''
+                if not res:
+                    break
+                if not self.stale(self.address, res):
+                    replies.append(res)
+
+        except asyncio.CancelledError:
+            self.abandon(self.address, len(pending) - len(replies))
+            raise
+
+        finally:
+            self.lock.release()
+
+        results.extend(self.match(pending, replies))
+        await self.settle()
+
+    async def run_path(self, waypoints, blend=50, radius=None, v=None, a=None) -> list:
+        async with self.pipeline() as handles:
+            for move, args, kwargs in self.plan_path(waypoints, blend, radius, v, a):
+                await move(*args, **kwargs)
+
+        return handles
+
+    async def ReadDI(self, *indices: int) -> IOState | list:
+        state = IOState(indices)
+        return await self.DIGroup(state.query, out=state)
+
+    async def ReadDO(self, *indices: int) -> IOState | list:
+        state = IOState(indices)
+        return await self.GetDOGroup(state.query, out=state)
+
+    async def snapshot(self) -> RobotState:
+        failed = []
+        async with self.pipeline() as results:
+            for query in self.state_queries(True, failed):
+                await query()
+
+        return self.build_state(None, results, failed)
+
+    async def progress(self) -> tuple[int, int]:
+        async with self.pipeline() as results:
+            await self.GetCurrentCommandID()
+            await self.RobotMode()
+
+        current, mode = results
+        if not (current and mode):
+            raise ConnectionError('No motion progress from Dobot.')
+        return current[0], mode[0]
+
+    async def update(self) -> None:
+        self.motions = [handle for handle in self.motions if not handle.done]
+        if self.motions:
+            self.retire(await self.progress())
+
+    async def connect(self) -> bool:
+        if not self.conn:
+            raise ConnectionError('Conn is not prepared!')
+
+        try:
+            self.info(f'Connecting to {self.address}')
+            await self.conn.connect(self.address)
+            self.info('Connection established.')
+
+        # refused or unreachable sockets and missing ports, a file that is no tty fails in termios
+        except (OSError, termios.error) as e:
+            self.error(f'Connection failed: {e}')
+            # the transport object stays, so a later `connect()` can retry
+            await self.conn.disconnect()
+            return False
+
+        self.shadow.clear()
+        self.abandoned.clear()
+        return True
+
+    async def disconnect(self) -> None:
+        if not (self.conn and self.conn.status):
+            self.debug('No active connection to disconnect.')
+            return
+
+        self.info('Disconnecting...')
+        await self.conn.disconnect()
+        self.info('Disconnected.')
+
+
 # init display and touchscreen
 disp = display.Display()
 touch = touchscreen.TouchScreen()
@@ -1111,13 +3180,16 @@ screen = image.Image(MAIX_CAM_WIDTH, MAIX_CAM_HEIGHT)
 image.load_font('Maple Mono', '/root/fonts/MapleMono-Regular.ttf', 40)
 image.set_default_font('Maple Mono')
 
+# one reactor reads both links, the ui loop keeps it drained between touches
+reactor = IOReactor()
+
 # init UART0 for communication with dobot arm
-dobot = Dobot('/dev/ttyS0', isSerial=True)
+dobot = Dobot('/dev/ttyS0', isSerial=True, reactor=reactor)
 
 # init UART2 for communication with embedded ESP32
 pinmap.set_pin_function('A29', 'UART2_RX')
 pinmap.set_pin_function('A28', 'UART2_TX')
-esp = SerialConn('ESP32')
+esp = SerialConn('ESP32', reactor=reactor)
 
 # define the positions for dobot arm
 station_1 = [-170, -30, -90, -60, -80, 0]
@@ -1126,6 +3198,9 @@ station_2 = [-130, -30, -90, -60, -40, 0]
 position_1 = [-160, -30, -80, -70, 20, 0]
 position_2 = [-140, -30, -80, -70, -140, 0]
 
+# upper bound in seconds for a single move, the arm continues as soon as it is done
+move_timeout = 15
+
 # define input state
 input_ph_str = ''
 
@@ -1469,17 +3544,28 @@ def dobot_init():
     dobot.connect()
     time.sleep(1)
 
-    dobot.ClearError()
-    dobot.EnableRobot(0.2, 0, 0, 0, 1)
-    time.sleep(1)
+    with dobot.pipeline():
+        dobot.ClearError()
+        dobot.EnableRobot(0.2, 0, 0, 0, 1)
+        dobot.SpeedFactor(40)
+        dobot.Grab(False)
+
 
-    dobot.SpeedFactor(40)
-    dobot.Grab(False)
+def esp32_recv(deadline: float) -> str:
+    handle = esp.recv(max(deadline - monotonic(), 0))
 
+    if not handle:
+        dobot.error(f'No response from {esp.name} before the deadline.', esp.name)
+        raise TimeoutError(f'No response from {esp.name} before the deadline.')
+
+    return handle
+
+
+def esp32_init(timeout=5):
+    deadline = monotonic() + timeout
 
-def esp32_init():
     esp.send('START')
-    handle = esp.recv()
+    handle = esp32_recv(deadline)
 
     if handle == 'READY':
         dobot.info(f'{esp.name} ready', esp.name)
@@ -1488,45 +3574,53 @@ def esp32_init():
         raise ConnectionError('ESP32 is not prepared.')
 
 
-def dobot_grab_at_position(position, grab=True, v=100):
-    dobot.MovJJoint(position)
-    time.sleep(2)
+def tool_offset(dy, v=None):
+    return Waypoint(Vector6([0, dy, 0, 0, 0, 0]), linear=True, relative=True, v=v)
+
 
-    dobot.RelMovLTool(0, -70, 0, 0, 0, 0, _v=v)
-    time.sleep(3)
+def wait_moves(*handles, timeout=move_timeout) -> MotionHandle:
+    # a missing reply or a move the controller did not queue leaves `[]` where the handle should be
+    missing = [handle for handle in handles if not isinstance(handle, MotionHandle)]
+    if missing or not handles:
+        raise RuntimeError(f'Move not queued by Dobot, got {missing or "nothing"} instead of a motion handle.')
+    return handles[-1].wait(timeout)
+
+
+# the arm may carry the vessel on every one of these moves, none is blended and each is waited for,
+# approach and descent still go out in a single round trip
+def dobot_grab_at_position(position, grab=True, v=100):
+    wait_moves(*dobot.run_path([position, tool_offset(-70, v)], 0))
 
     dobot.Grab(grab)
-    dobot.RelMovLTool(0, 40, 0, 0, 0, 0, _v=v)
-    time.sleep(2)
+    return wait_moves(dobot.RelMovLTool(0, 40, 0, 0, 0, 0, _v=v, _cp=0))
 
 
 def dobot_work_at_station(station, hight, handler):
-    dobot.MovJJoint(station)
-    time.sleep(2)
-
-    dobot.RelMovLTool(0, hight, 0, 0, 0, 0)
-    time.sleep(3)
+    wait_moves(*dobot.run_path([station, tool_offset(hight)], 0))
 
     handler()
 
-    dobot.MovLJoint(station)
-    time.sleep(2)
+    return wait_moves(dobot.MovLJoint(station, cp=0))
 
 
-def esp32_get_max_steps():
+def esp32_get_max_steps(timeout=5):
     global max_steps
 
+    deadline = monotonic() + timeout
+
     esp.send('GET_MAX_STEPS')
-    data_MAX_STEPS = esp.recv()
+    data_MAX_STEPS = esp32_recv(deadline)
     if not data_MAX_STEPS.startswith('MAX_STEPS'):
         dobot.error('Invalid MAX_STEPS response from ESP32.')
     max_steps = int(data_MAX_STEPS.split(':')[1])
     dobot.info(f'Max steps from {esp.name}: {max_steps}', esp.name)
 
 
-def esp32_handle_up(speed, steps, direction='UP'):
+def esp32_handle_up(speed, steps, direction='UP', timeout=120):
+    deadline = monotonic() + timeout
+
     esp.send('DO_INJECT')
-    handle = esp.recv()
+    handle = esp32_recv(deadline)
 
     if handle == 'STEPPER_START':
         dobot.info('Start', 'Stepper Moter')
@@ -1534,7 +3628,7 @@ def esp32_handle_up(speed, steps, direction='UP'):
         esp.send(f'SET_STEPPER:{speed},{steps},{direction}')
 
         while True:
-            handle = esp.recv()
+            handle = esp32_recv(deadline)
             if handle.startswith('STEPPER_CONFIGURED'):
                 configured_params = handle.split(':', 1)[1]
                 dobot.info(f'Stepper configured: {configured_params}', 'Stepper Moter')
@@ -1549,9 +3643,11 @@ def esp32_handle_up(speed, steps, direction='UP'):
     time.sleep(4)
 
 
-def esp32_handle_down(speed, steps, direction='DOWN'):
+def esp32_handle_down(speed, steps, direction='DOWN', timeout=120):
+    deadline = monotonic() + timeout
+
     esp.send('DO_INJECT')
-    handle = esp.recv()
+    handle = esp32_recv(deadline)
 
     if handle == 'STEPPER_START':
         dobot.info('Start', 'Stepper Moter')
@@ -1559,7 +3655,7 @@ def esp32_handle_down(speed, steps, direction='DOWN'):
         esp.send(f'SET_STEPPER:{speed},{steps},{direction}')
 
         while True:
-            handle = esp.recv()
+            handle = esp32_recv(deadline)
             if handle.startswith('STEPPER_CONFIGURED'):
                 configured_params = handle.split(':', 1)[1]
                 dobot.info(f'Stepper configured: {configured_params}', 'Stepper Moter')
@@ -1574,15 +3670,16 @@ def esp32_handle_down(speed, steps, direction='DOWN'):
     time.sleep(4)
 
 
-def esp32_handle_mix_getph():
+def esp32_handle_mix_getph(timeout=120):
+    deadline = monotonic() + timeout
+
     esp.send('DO_MIX')
-    handle = esp.recv()
+    handle = esp32_recv(deadline)
 
     if handle == 'MIX_START':
         dobot.info('mixing start', 'Mixing Moter')
         while True:
-            handle = esp.recv()
-            time.sleep_us(100)
+            handle = esp32_recv(deadline)
             if handle == 'MIX_DONE':
                 dobot.info('mixing done', 'Mixing Moter')
                 break
@@ -1592,11 +3689,13 @@ def esp32_handle_mix_getph():
     time.sleep(2)
 
 
-def esp32_handle_getph():
+def esp32_handle_getph(timeout=10):
     global get_ph_val
 
+    deadline = monotonic() + timeout
+
     esp.send('GET_PH')
-    data_PH = esp.recv()
+    data_PH = esp32_recv(deadline)
     if not data_PH.startswith('pH'):
         dobot.error('Invalid pH response from ESP32.')
     get_ph_val = float(data_PH.split(':')[1])
@@ -1640,21 +3739,32 @@ if __name__ == '__main__':
 
         if pressed and not last_pressed:
             last_pressed = pressed
-            match curr_state:
-                case State.INIT:
-                    on_clicked_init(x, y)
-                case State.HOME:
-                    on_clicked_home(x, y)
-                case State.INPUT:
-                    on_clicked_input(x, y)
-                case State.MSG:
-                    on_clicked_msg(x, y)
-                case State.EXEC:
-                    on_clicked_exec(x, y)
-                case State.STEP:
-                    on_clicked_step(x, y)
+            try:
+                match curr_state:
+                    case State.INIT:
+                        on_clicked_init(x, y)
+                    case State.HOME:
+                        on_clicked_home(x, y)
+                    case State.INPUT:
+                        on_clicked_input(x, y)
+                    case State.MSG:
+                        on_clicked_msg(x, y)
+                    case State.EXEC:
+                        on_clicked_exec(x, y)
+                    case State.STEP:
+                        on_clicked_step(x, y)
+            # link errors and failed or late moves, `TimeoutError` is an `OSError`
+            except (OSError, RuntimeError) as e:
+                dobot.error(f'Dobot task failed: {e}')
+                send_msg('Dobot task failed!', 'ERROR', image.COLOR_WHITE, 1.5)
 
         elif not pressed:
             last_pressed = pressed
 
+        reactor.poll(monotonic())
+        try:
+            dobot.update()
+        except (OSError, RuntimeError) as e:
+            # neither a lost link nor a failed move may take the UI down, failed moves are retired
+            dobot.error(f'Motion update failed: {e}')
         disp.show(screen)
@@ -0,0 +1,469 @@
+import os
+import pty
+import random
+import socket
+import threading
+import tty
+from functools import partial
+from time import monotonic, sleep
+
+from kinematics import Arm
+
+
+def split_args(args: str) -> list:
+    # split on the commas outside of `{}`
+    parts = []
+    depth = 0
+    start = 0
+    for idx, char in enumerate(args):
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(args[start:idx].strip())
+            start = idx + 1
+
+    tail = args[start:].strip()
+    if tail or parts:
+        parts.append(tail)
+    return parts
+
+
+def parse_vector(arg: str) -> tuple[str, list]:
+    # `joint={1,2,3,4,5,6}` -> ('joint', [1.0, ...]), a bare `{...}` has no kind
+    kind, _, values = arg.rpartition('=')
+    return kind, [float(v) for v in values.strip('{}').split(',') if v]
+
+
+def format_values(values) -> str:
+    return ','.join(f'{v:.4f}' if isinstance(v, float) else str(v) for v in values)
+
+
+class PtyLink:
+    """Device side of a pseudo-terminal, `path` is what the client opens as its serial port."""
+
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        # the slave end stays open here too, so the master never reads EIO between clients
+        self.path = os.ttyname(self.slave)
+        self.buffer = b''
+
+    def read(self) -> bytes:
+        return os.read(self.master, 4096)
+
+    def readline(self) -> str:
+        while b'\n' not in self.buffer:
+            chunk = self.read()
+            if not chunk:
+                raise EOFError('Pseudo-terminal closed.')
+            self.buffer += chunk
+
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return line.decode().strip()
+
+    def write(self, data: bytes) -> None:
+        while data:
+            data = data[os.write(self.master, data) :]
+
+    def close(self) -> None:
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class RobotMode:
+    INIT = 1
+    BRAKE_OPEN = 2
+    POWER_OFF = 3
+    DISABLED = 4
+    ENABLE = 5
+    BACKDRIVE = 6
+    RUNNING = 7
+    ERROR = 9
+    PAUSE = 10
+
+
+class DobotSimulator:
+    """Local stand-in for the Dobot dashboard, answers with `ErrorID,{values},Cmd(args);`.
+
+    `latency` and `jitter` delay every reply in seconds, `errors` maps a command name to the
+    error code it always fails with, `error_rate` fails any command at random with `error_code`,
+    and every move keeps the arm running for `move_time` seconds. Poses and joints are kept
+    consistent through `arm`, targets it cannot reach fail as a parameter error.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        errors=None,
+        error_rate=0.0,
+        error_code=-1,
+        move_time=0.0,
+        arm=None,
+        seed=None,
+        handle=print,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = errors or {}
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.move_time = move_time
+        self.arm = arm or Arm()
+        self.random = random.Random(seed)
+        self.handle = handle
+
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.speed = 100
+        self.gripper = 0
+        self.joints = [0.0] * 6
+        self.pose = list(self.arm.fk(self.joints))
+        self.command_id = 0
+        self.busy_until = 0.0
+        # digital IO levels by port index, `di` can be set to stage inputs
+        self.di = {}
+        self.do = {}
+        self.servers = []
+
+    # region commands
+
+    def mode(self) -> int:
+        if not self.enabled:
+            return RobotMode.DISABLED
+        return RobotMode.RUNNING if monotonic() < self.busy_until else RobotMode.ENABLE
+
+    def move(self, joints=None, pose=None) -> list:
+        if joints is None:
+            joints = list(self.arm.ik(pose, near=self.joints))
+        self.joints = joints
+        self.pose = list(self.arm.fk(joints))
+
+        self.command_id += 1
+        self.busy_until = max(self.busy_until, monotonic()) + self.move_time
+        return [self.command_id]
+
+    def target(self, arg: str):
+        kind, values = parse_vector(arg)
+        return (values, None) if kind == 'joint' else (None, values)
+
+    def execute(self, name: str, args: list):
+        match name:
+            case 'EnableRobot':
+                self.enabled = True
+            case 'DisableRobot':
+                self.enabled = False
+            case 'SpeedFactor':
+                self.speed = int(args[0]) if args else self.speed
+            case 'SetParallelGripper':
+                self.gripper = int(float(args[0]))
+            case 'RobotMode':
+                return [self.mode()]
+            case 'GetAngle':
+                return self.joints
+            case 'GetPose':
+                return self.pose
+            case 'GetForce':
+                return [0.0] * 6
+            case 'DO' | 'DOInstant':
+                self.do[int(args[0])] = int(args[1])
+            case 'GetDO':
+                return [self.do.get(int(args[0]), 0)]
+            case 'DOGroup':
+                for index, level in zip(args[::2], args[1::2]):
+                    self.do[int(index)] = int(level)
+            case 'GetDOGroup':
+                return [self.do.get(int(index), 0) for index in args]
+            case 'DI':
+                return [self.di.get(int(args[0]), 0)]
+            case 'DIGroup':
+                return [self.di.get(int(index), 0) for index in args]
+            case 'GetErrorID':
+                return ['[[],[],[],[],[],[],[]]']
+            case 'GetCurrentCommandID':
+                # the last move counts as current until it has finished
+                return [self.command_id if self.mode() != RobotMode.RUNNING else self.command_id - 1]
+            case 'MovJ' | 'MovL':
+                return self.move(*self.target(args[0]))
+            case 'PositiveKin':
+                return list(self.arm.fk([float(v) for v in args[:6]]))
+            case 'InverseKin':
+                return list(self.arm.ik([float(v) for v in args[:6]], near=self.joints))
+            case 'RelMovLTool' | 'RelMovJTool':
+                offsets = [float(v) for v in args[:6]]
+                return self.move(pose=self.arm.offset(self.pose, offsets))
+            case 'RelMovLUser' | 'RelMovJUser':
+                offsets = [float(v) for v in args[:6]]
+                return self.move(pose=[p + o for p, o in zip(self.pose, offsets)])
+            case 'RelJointMovJ':
+                offsets = [float(v) for v in args[:6]]
+                return self.move(joints=[j + o for j, o in zip(self.joints, offsets)])
+
+        return []
+
+    def respond(self, line: str) -> str:
+        name, _, args = line.partition('(')
+        args = split_args(args.removesuffix(')'))
+
+        with self.lock:
+            err = self.errors.get(name, 0)
+            if not err and self.error_rate and self.random.random() < self.error_rate:
+                err = self.error_code
+
+            try:
+                values = [] if err else self.execute(name, args)
+            except (ValueError, IndexError):
+                err, values = -30001, []
+
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            sleep(delay)
+
+        return f'{err},{{{format_values(values)}}},{line};'
+
+    # endregion
+    # -------------
+    # region server
+
+    def _serve(self, read, write):
+        buffer = b''
+        while True:
+            try:
+                chunk = read()
+            except OSError:
+                break
+            if not chunk:
+                break
+
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                line = line.decode().strip()
+                if line:
+                    write(self.respond(line).encode())
+
+    def serve_tcp(self, host='127.0.0.1', port=0) -> tuple:
+        """Listen for dashboard clients, returns the bound address."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host, port))
+        server.listen()
+        self.servers.append(server)
+
+        def accept_loop():
+            while True:
+                try:
+                    client, peer = server.accept()
+                except OSError:
+                    break
+
+                self.handle(f'-- [I] [Simulator] client {peer}')
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                reader = partial(client.recv, 4096)
+                threading.Thread(target=self._serve, args=(reader, client.sendall), daemon=True).start()
+
+        threading.Thread(target=accept_loop, daemon=True).start()
+        return server.getsockname()
+
+    def serve_pty(self) -> str:
+        """Answer on a pseudo-terminal, returns the device path to open as a serial port."""
+        link = PtyLink()
+        self.servers.append(link)
+
+        threading.Thread(target=self._serve, args=(link.read, link.write), daemon=True).start()
+        return link.path
+
+    def close(self) -> None:
+        for server in self.servers:
+            server.close()
+        self.servers.clear()
+
+    # endregion
+
+
+class ESP32Simulator:
+    """Local stand-in for the ESP32 firmware in `embeded/main.py`, answers line by line over a pty.
+
+    The pH probe reads `ph` plus gaussian `noise` through the firmware's Kalman filter, every
+    `DOWN` injection shifts the bath by `ph_per_step` per step and mixing settles it towards that
+    target with time constant `mix_time` seconds. `time_scale` stretches every firmware delay,
+    `0` answers as fast as the host allows.
+    """
+
+    MAX_STEPS = 4000
+    STEPS_PER_REV = 200
+
+    def __init__(self, ph=7.0, noise=0.02, ph_per_step=-0.001, mix_time=2.0, time_scale=1.0, seed=None, handle=print):
+        self.ph = ph
+        self.target = ph
+        self.noise = noise
+        self.ph_per_step = ph_per_step
+        self.mix_time = mix_time
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+        self.handle = handle
+
+        # KalmanFilter(7.0, 1.0, 0.01, 0.1) as built by the firmware, `update` only
+        self.estimate = 7.0
+        self.uncertainty = 1.0
+        self.measurement_variance = 0.1
+
+        self.mixing = False
+        self.position = 0
+        self.servers = []
+
+    # region firmware
+
+    def sleep(self, seconds: float) -> None:
+        if self.time_scale > 0:
+            sleep(seconds * self.time_scale)
+
+    def read_ph(self, elapsed=0.0) -> float:
+        if self.mixing and self.mix_time > 0:
+            self.ph += (self.target - self.ph) * min(elapsed / self.mix_time, 1.0)
+
+        raw = self.ph + (self.random.gauss(0, self.noise) if self.noise else 0)
+        gain = self.uncertainty / (self.uncertainty + self.measurement_variance)
+        self.estimate += gain * (raw - self.estimate)
+        self.uncertainty *= 1 - gain
+        return self.estimate
+
+    def get_ph(self) -> float:
+        ph = self.read_ph()
+        for _ in range(100):
+            ph = self.read_ph()
+            self.sleep(0.005)
+        return ph
+
+    def do_mix(self, send) -> None:
+        send('MIX_START')
+        self.mixing = True
+
+        values_counter = 0
+        last_ph = 0.0
+        for _ in range(50000):
+            ph = self.read_ph(0.001)
+            values_counter = values_counter + 1 if abs(ph - last_ph) <= 0.05 else 0
+            if values_counter >= 10:
+                send(f'PH_STABLE_AT:{ph:.2f}')
+                break
+
+            last_ph = ph
+            self.sleep(0.001)
+
+        self.sleep(1)
+        send('MIX_DONE')
+        self.mixing = False
+
+    def do_inject(self, send, recv) -> None:
+        send('STEPPER_START')
+
+        while True:
+            data = recv()
+            if data.startswith('SET_STEPPER'):
+                # a malformed payload raises here just like on the board, which stops the firmware
+                rpm, steps, direction = data.split(':', 1)[1].split(',')
+                if rpm.isdigit() and steps.isdigit() and direction in ('UP', 'DOWN'):
+                    send(f'STEPPER_CONFIGURED:RPM={rpm},STEPS={steps},DIR={direction}')
+                    break
+                send('STEPPER_CONFIG_INVALID')
+            elif data:
+                send('STEPPER_RECV_INVALID')
+
+        rpm, steps = int(rpm), int(steps)
+        if steps > 0:
+            assert rpm > 0, 'RPM must be positive!'
+            delay_us = max(60 * 1000000 / (self.STEPS_PER_REV * rpm), 20)
+            self.sleep((20 + steps * (10 + int(delay_us))) / 1e6)
+
+            self.position += steps if direction == 'UP' else -steps
+            if direction == 'DOWN':
+                self.target += self.ph_per_step * steps
+
+        self.sleep(1)
+        send('STEPPER_DONE')
+
+    def run(self, link: PtyLink) -> None:
+        def send(data: str):
+            link.write(data.encode() + b'\n')
+
+        while True:
+            try:
+                cmd = link.readline().upper()
+                match cmd:
+                    case '':
+                        continue
+                    case 'PING':
+                        send('PONG')
+                    case 'GET_MAX_STEPS':
+                        send(f'MAX_STEPS:{self.MAX_STEPS}')
+                    case 'GET_PH':
+                        send(f'pH:{self.get_ph():.2f}')
+                    case 'START':
+                        send('READY')
+                    case 'DO_MIX':
+                        self.do_mix(send)
+                    case 'DO_INJECT':
+                        self.do_inject(send, link.readline)
+                    case 'DONE':
+                        send('DONE')
+
+                self.sleep(0.1)
+            except (EOFError, OSError):
+                break
+            except (ValueError, AssertionError) as e:
+                self.handle(f'-- [E] [Simulator] firmware stopped: {e!r}')
+                break
+
+    # endregion
+    # -------------
+    # region server
+
+    def serve_pty(self) -> str:
+        """Run the firmware on a pseudo-terminal, returns the device path to open as a serial port."""
+        link = PtyLink()
+        self.servers.append(link)
+
+        threading.Thread(target=self.run, args=(link,), daemon=True).start()
+        return link.path
+
+    def close(self) -> None:
+        for server in self.servers:
+            server.close()
+        self.servers.clear()
+
+    # endregion
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local Dobot dashboard and ESP32 firmware simulator.')
+    parser.add_argument('device', nargs='?', choices=('dobot', 'esp32'), default='dobot')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=29999)
+    parser.add_argument('--pty', action='store_true', help='serve on a pseudo-terminal instead of tcp')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--move-time', type=float, default=0.0)
+    parser.add_argument('--ph', type=float, default=7.0)
+    parser.add_argument('--time-scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.device == 'esp32':
+        simulator = ESP32Simulator(args.ph, time_scale=args.time_scale)
+        print(f'ESP32 simulator on {simulator.serve_pty()}')
+    else:
+        simulator = DobotSimulator(args.latency, args.jitter, error_rate=args.error_rate, move_time=args.move_time)
+        if args.pty:
+            print(f'Dobot simulator on {simulator.serve_pty()}')
+        else:
+            print(f'Dobot simulator on {simulator.serve_tcp(args.host, args.port)}')
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        simulator.close()
@@ -0,0 +1,140 @@
+"""Move durations predicted from trapezoidal velocity profiles, so work elsewhere can be timed to the arm.
+
+Speeds follow the ratios kept in `Dobot.session`, and a few timed moves calibrate the estimates.
+
+    estimator = MoveEstimator()
+    estimator.configure(dobot.session)
+    start = dobot.GetAngle()
+    seconds = estimator.joint(start, station_1)
+
+    # calibrate from moves queued while the arm was idle
+    handle = dobot.MovJJoint(station_1)
+    estimator.record('joint', start, station_1, handle.wait().elapsed)
+    estimator.calibrate()
+"""
+
+from math import sqrt
+
+from dobot import Pose, Vector6
+from kinematics import Arm, pose_to_transform, rotation_error
+
+
+def trapezoid(distance: float, velocity: float, acceleration: float) -> float:
+    """Seconds to travel `distance` from rest to rest, a triangle when cruise speed is never reached."""
+    distance = abs(distance)
+    if not distance:
+        return 0.0
+    # a zero speed or acceleration ratio, e.g. after `SpeedFactor(0)`, never gets anywhere
+    if velocity <= 0 or acceleration <= 0:
+        raise ValueError(f'No motion at velocity {velocity} and acceleration {acceleration}.')
+    if distance * acceleration < velocity * velocity:
+        return 2 * sqrt(distance / acceleration)
+    return distance / velocity + velocity / acceleration
+
+
+def parse_ratio(cmd: str) -> int:
+    # `SpeedFactor(40)` -> 40, as kept in `Dobot.session`
+    return int(float(cmd[cmd.index('(') + 1 : -1].split(',', 1)[0]))
+
+
+class MoveEstimator:
+    """Predicts `MovJ` and `MovL` durations, scaled by the speed settings in effect on the controller.
+
+    The limits below are nominal full speed values, `calibrate` fits a scale and a fixed overhead per
+    kind of move to recorded runs which absorbs what the profiles leave out.
+    """
+
+    # per joint, deg/s and deg/s^2
+    JOINT_VELOCITY = (180.0, 180.0, 180.0, 180.0, 180.0, 180.0)
+    JOINT_ACCELERATION = (360.0, 360.0, 360.0, 360.0, 360.0, 360.0)
+    # tool centre point, mm/s and mm/s^2, and its orientation in deg/s and deg/s^2
+    LINEAR_VELOCITY = 1000.0
+    LINEAR_ACCELERATION = 4000.0
+    ROTATION_VELOCITY = 180.0
+    ROTATION_ACCELERATION = 720.0
+
+    KINDS = ('joint', 'linear')
+
+    def __init__(self, arm: Arm | None = None):
+        self.arm = arm or Arm()
+        self.ratios = {'SpeedFactor': 100, 'VelJ': 100, 'AccJ': 100, 'VelL': 100, 'AccL': 100}
+        # seconds = scale * profile + overhead
+        self.fits = {kind: (1.0, 0.0) for kind in self.KINDS}
+        self.runs = {kind: [] for kind in self.KINDS}
+
+    def configure(self, session: dict) -> None:
+        """Take the speed ratios from `Dobot.session`, settings never sent keep the controller default."""
+        for name in self.ratios:
+            if name in session:
+                self.ratios[name] = parse_ratio(session[name])
+
+    def joints(self, point, near=None) -> list:
+        # plain lists are joints, as everywhere in main.py
+        if isinstance(point, Pose):
+            return list(self.arm.ik(point, near))
+        return list(point)
+
+    def pose(self, point) -> Vector6:
+        return point if isinstance(point, Pose) else self.arm.fk(point)
+
+    def profile(self, kind: str, start, target, v=100, a=100) -> float:
+        """Uncalibrated seconds of a move from `start` to `target`, with the move's own `v` and `a` ratios."""
+        # the global speed factor scales acceleration as well as velocity
+        speed = self.ratios['SpeedFactor'] / 100
+
+        if kind == 'joint':
+            vel = speed * self.ratios['VelJ'] / 100 * v / 100
+            acc = speed * self.ratios['AccJ'] / 100 * a / 100
+            start = self.joints(start)
+            target = self.joints(target, start)
+            # every joint arrives together, the slowest one sets the pace
+            return max(
+                trapezoid(q1 - q0, vmax * vel, amax * acc)
+                for q0, q1, vmax, amax in zip(start, target, self.JOINT_VELOCITY, self.JOINT_ACCELERATION)
+            )
+
+        vel = speed * self.ratios['VelL'] / 100 * v / 100
+        acc = speed * self.ratios['AccL'] / 100 * a / 100
+        A, B = pose_to_transform(self.pose(start)), pose_to_transform(self.pose(target))
+        distance = sqrt(sum((B[i][3] - A[i][3]) ** 2 for i in range(3)))
+        return max(
+            trapezoid(distance, self.LINEAR_VELOCITY * vel, self.LINEAR_ACCELERATION * acc),
+            trapezoid(rotation_error(A, B), self.ROTATION_VELOCITY * vel, self.ROTATION_ACCELERATION * acc),
+        )
+
+    def estimate(self, kind: str, start, target, v=100, a=100) -> float:
+        scale, overhead = self.fits[kind]
+        return scale * self.profile(kind, start, target, v, a) + overhead
+
+    def joint(self, start, target, v=100, a=100) -> float:
+        return self.estimate('joint', start, target, v, a)
+
+    def linear(self, start, target, v=100, a=100) -> float:
+        return self.estimate('linear', start, target, v, a)
+
+    def tool(self, start, offset, v=100, a=100) -> float:
+        """Duration of `RelMovLTool` by `offset` from `start`."""
+        return self.linear(start, Arm.offset(self.pose(start), offset), v, a)
+
+    def record(self, kind: str, start, target, seconds: float, v=100, a=100) -> None:
+        if seconds is not None:
+            self.runs[kind].append((self.profile(kind, start, target, v, a), seconds))
+
+    def calibrate(self) -> dict:
+        """Least squares fit of scale and overhead per kind, a single run only fixes the scale."""
+        for kind, runs in self.runs.items():
+            if len(runs) == 1:
+                profile, seconds = runs[0]
+                self.fits[kind] = (seconds / profile if profile else 1.0, 0.0)
+            elif runs:
+                n = len(runs)
+                mx = sum(profile for profile, _ in runs) / n
+                my = sum(seconds for _, seconds in runs) / n
+                var = sum((profile - mx) ** 2 for profile, _ in runs)
+                if var:
+                    scale = sum((profile - mx) * (seconds - my) for profile, seconds in runs) / var
+                    self.fits[kind] = (scale, my - scale * mx)
+                else:
+                    self.fits[kind] = (1.0, my - mx)
+
+        return self.fits